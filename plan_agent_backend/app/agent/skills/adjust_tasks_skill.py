@@ -11,7 +11,7 @@ from app.agent.types import SkillResult
 from app.dependencies import SessionLocal
 from app.models import Goal, Task, ExecutionLog, ReflectionLog
 from app.services.llm_service import llm_service
-from app.utils.timezone import get_utc_now
+from app.utils.timezone import format_hhmm, get_utc_now, parse_hhmm
 
 
 class AdjustTasksSkill(BaseSkill):
@@ -71,7 +71,7 @@ class AdjustTasksSkill(BaseSkill):
                     "title": t.title,
                     "description": t.description,
                     "due_date": t.due_date.isoformat(),
-                    "due_time": t.due_time,
+                    "due_time": format_hhmm(t.due_time),
                     "status": t.status,
                     "priority": t.priority,
                     "dependencies": t.dependencies,
@@ -167,7 +167,7 @@ class AdjustTasksSkill(BaseSkill):
                     if new_date:
                         task.due_date = date.fromisoformat(new_date)
                     if adj.get("new_due_time"):
-                        task.due_time = adj.get("new_due_time")
+                        task.due_time = parse_hhmm(adj.get("new_due_time"))
                     applied.append({"task_id": task_id, "action": action, "status": "applied"})
                 
                 elif action == "change_priority":
@@ -189,7 +189,7 @@ class AdjustTasksSkill(BaseSkill):
                         title=adj.get("title", ""),
                         description=adj.get("description", ""),
                         due_date=date.fromisoformat(adj.get("due_date", date.today().isoformat())),
-                        due_time=adj.get("due_time"),
+                        due_time=parse_hhmm(adj.get("due_time")),
                         status="pending",
                         priority=adj.get("priority", 1),
                     )
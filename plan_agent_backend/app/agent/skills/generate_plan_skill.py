@@ -11,7 +11,7 @@ from app.agent.types import SkillResult
 from app.dependencies import SessionLocal
 from app.models import User, Goal, Task, UserMemory, FixedSchedule
 from app.services.llm_service import llm_service
-from app.utils.timezone import get_utc_now
+from app.utils.timezone import get_utc_now, parse_hhmm
 
 
 class GeneratePlanSkill(BaseSkill):
@@ -162,7 +162,7 @@ class GeneratePlanSkill(BaseSkill):
                     title=task_data.get("title", ""),
                     description=task_data.get("description", ""),
                     due_date=due_date,
-                    due_time=task_data.get("due_time"),
+                    due_time=parse_hhmm(task_data.get("due_time")),
                     status="pending",
                     priority=task_data.get("priority", 1),
                     dependencies=task_data.get("dependencies"),
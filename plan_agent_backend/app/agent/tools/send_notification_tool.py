@@ -45,6 +45,9 @@ class SendNotificationTool(BaseTool):
         },
     }
 
+    # JPush 批量单推接口单次上限
+    MAX_BATCH = 1000
+
     def __init__(
         self,
         app_key: str | None = None,
@@ -53,6 +56,35 @@ class SendNotificationTool(BaseTool):
         self.app_key = app_key or settings.JPUSH_APP_KEY
         self.master_secret = master_secret or settings.JPUSH_MASTER_SECRET
         self.base_url = "https://api.jpush.cn/v3/push"
+        self.cid_url = "https://api.jpush.cn/v3/push/cid"
+        self.batch_url = "https://api.jpush.cn/v3/push/batch/regid/single"
+
+    def _auth_headers(self) -> dict:
+        import base64
+
+        credentials = base64.b64encode(
+            f"{self.app_key}:{self.master_secret}".encode()
+        ).decode()
+        return {
+            "Authorization": f"Basic {credentials}",
+            "Content-Type": "application/json",
+        }
+
+    def _build_notification(self, title: str, content: str, extras: dict) -> dict:
+        return {
+            "android": {
+                "alert": content,
+                "title": title,
+                "extras": extras,
+            },
+            "ios": {
+                "alert": {
+                    "title": title,
+                    "body": content,
+                },
+                "extras": extras,
+            },
+        }
 
     async def execute(self, parameters: dict, user_id: int | None = None) -> ToolResult:
         title = parameters.get("title", "").strip()
@@ -93,40 +125,19 @@ class SendNotificationTool(BaseTool):
             "audience": {
                 "registration_id": [push_token]
             },
-            "notification": {
-                "android": {
-                    "alert": content,
-                    "title": title,
-                    "extras": extras,
-                },
-                "ios": {
-                    "alert": {
-                        "title": title,
-                        "body": content,
-                    },
-                    "extras": extras,
-                },
-            },
+            "notification": self._build_notification(title, content, extras),
             "options": {
                 "time_to_live": 86400,
                 "apns_production": not settings.DEBUG,
             },
         }
-        
+
         try:
-            import base64
-            credentials = base64.b64encode(
-                f"{self.app_key}:{self.master_secret}".encode()
-            ).decode()
-            
             async with httpx.AsyncClient() as client:
                 response = await client.post(
                     self.base_url,
                     json=payload,
-                    headers={
-                        "Authorization": f"Basic {credentials}",
-                        "Content-Type": "application/json",
-                    },
+                    headers=self._auth_headers(),
                     timeout=30.0,
                 )
                 response.raise_for_status()
@@ -153,6 +164,96 @@ class SendNotificationTool(BaseTool):
         except Exception as e:
             return ToolResult(success=False, error=f"Notification failed: {str(e)}")
 
+    async def execute_bulk(self, messages: list[dict]) -> list[ToolResult]:
+        """批量单推：一次 HTTP 往返发送最多 MAX_BATCH 条各自不同的通知
+
+        messages 每项: {"push_token", "title", "content", "extras"}。
+        返回与 messages 等长、顺序对应的 ToolResult 列表。
+        """
+        if not messages:
+            return []
+
+        if not self.app_key or not self.master_secret:
+            error = ToolResult(
+                success=False,
+                error="JPush credentials are not configured. Please set JPUSH_APP_KEY and JPUSH_MASTER_SECRET.",
+            )
+            return [error] * len(messages)
+
+        results: list[ToolResult] = []
+        headers = self._auth_headers()
+
+        async with httpx.AsyncClient() as client:
+            for start in range(0, len(messages), self.MAX_BATCH):
+                chunk = messages[start : start + self.MAX_BATCH]
+                try:
+                    # 批量接口要求先领取一批 cid 作为幂等推送 ID
+                    cid_resp = await client.get(
+                        self.cid_url,
+                        params={"count": len(chunk), "type": "push"},
+                        headers=headers,
+                        timeout=30.0,
+                    )
+                    cid_resp.raise_for_status()
+                    cids = cid_resp.json().get("cidlist", [])
+
+                    pushlist = {}
+                    for cid, msg in zip(cids, chunk):
+                        pushlist[cid] = {
+                            "platform": "all",
+                            "target": msg["push_token"],
+                            "notification": self._build_notification(
+                                msg.get("title", ""),
+                                msg.get("content", ""),
+                                msg.get("extras", {}),
+                            ),
+                            "options": {
+                                "time_to_live": 86400,
+                                "apns_production": not settings.DEBUG,
+                            },
+                        }
+
+                    response = await client.post(
+                        self.batch_url,
+                        json={"pushlist": pushlist},
+                        headers=headers,
+                        timeout=30.0,
+                    )
+                    response.raise_for_status()
+                    data = response.json()
+
+                    for cid, msg in zip(cids, chunk):
+                        item = data.get(cid, {})
+                        if item.get("error"):
+                            results.append(
+                                ToolResult(
+                                    success=False,
+                                    error=f"JPush batch error: {item['error']}",
+                                )
+                            )
+                        else:
+                            results.append(
+                                ToolResult(
+                                    success=True,
+                                    data={
+                                        "message_id": item.get("msg_id"),
+                                        "status": "sent",
+                                    },
+                                )
+                            )
+                    # cid 不足时剩余消息记为失败
+                    for _ in chunk[len(cids):]:
+                        results.append(
+                            ToolResult(success=False, error="No cid allocated")
+                        )
+                except Exception as e:
+                    failure = ToolResult(
+                        success=False, error=f"Notification failed: {str(e)}"
+                    )
+                    results.extend([failure] * len(chunk))
+
+        return results
+
 
 # 自动注册
 from app.agent.registry import plugin_registry
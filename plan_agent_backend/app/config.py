@@ -12,6 +12,9 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: str = "your-super-secret-jwt-key-change-in-production"
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+
+    # bcrypt 代价因子；测试环境可调低 (如 4) 大幅加速
+    BCRYPT_ROUNDS: int = 12
     
     # LLM (Chat) API
     LLM_API_KEY: str = ""
@@ -26,14 +29,19 @@ class Settings(BaseSettings):
     EMBEDDING_API_KEY: str = ""
     EMBEDDING_API_BASE_URL: str = "https://api.openai.com/v1"
     EMBEDDING_MODEL: str = "text-embedding-3-small"
+    EMBEDDING_HEDGE: bool = False  # 并发请求前两个提供商，取最先成功者
+    EMBEDDING_BATCH_WINDOW: float = 0.02  # 单文本请求合批窗口 (秒)，0 表示禁用
+    EMBEDDING_CONCURRENCY: int = 4  # 流式批量生成的最大并发批次数
     
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8000"]
     
     # Redis 配置
     REDIS_URL: str = "redis://localhost:6379/0"
     REDIS_ENABLED: bool = False  # 设为 True 启用 Redis
+    REDIS_POOL_SIZE: int = 50  # 连接池上限
     CACHE_TTL_DEFAULT: int = 300  # 默认缓存时间 (秒)
     SESSION_CACHE_TTL: int = 3600  # 会话缓存时间 (1小时)
+    LOCAL_CACHE_TTL: float = 1.0  # 进程内缓存时间 (秒)，0 表示禁用
     
     DEBUG: bool = True
     
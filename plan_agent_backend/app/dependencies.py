@@ -12,19 +12,28 @@ from app.config import settings
 from app.utils.timezone import get_utc_now
 from app.models import Base, User
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,  # 连接存活检测
-    pool_size=10,         # 常规连接池大小
-    max_overflow=20,     # 最大溢出连接数
-    pool_recycle=3600,    # 连接回收周期 (1小时)
-    pool_timeout=30,      # 获取连接超时时间
-    echo=settings.DEBUG,
-)
+_engine_kwargs: dict = {
+    "pool_pre_ping": True,  # 连接存活检测
+    "echo": settings.DEBUG,
+}
+# 连接池参数为服务端数据库专有；SQLite (测试环境) 的连接池不接受这些参数
+if not settings.DATABASE_URL.startswith("sqlite"):
+    _engine_kwargs.update(
+        pool_size=10,      # 常规连接池大小
+        max_overflow=20,   # 最大溢出连接数
+        pool_recycle=3600,  # 连接回收周期 (1小时)
+        pool_timeout=30,   # 获取连接超时时间
+    )
+
+engine = create_engine(settings.DATABASE_URL, **_engine_kwargs)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
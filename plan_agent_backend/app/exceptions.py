@@ -8,6 +8,7 @@ from enum import Enum
 from fastapi import Request, status
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from pydantic import ValidationError
 import traceback
@@ -324,6 +325,19 @@ async def app_exception_handler(request: Request, exc: AppException):
     )
 
 
+async def http_exception_handler(request: Request, exc: StarletteHTTPException):
+    """HTTPException 处理器：路由直接 raise 的 HTTPException 也输出统一错误格式"""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={
+            "success": False,
+            "error": exc.detail,
+            "error_code": None,
+        },
+        headers=getattr(exc, "headers", None),
+    )
+
+
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """参数验证异常处理器"""
     errors = []
@@ -386,6 +400,7 @@ async def generic_exception_handler(request: Request, exc: Exception):
 def register_exception_handlers(app):
     """注册所有异常处理器"""
     app.add_exception_handler(AppException, app_exception_handler)
+    app.add_exception_handler(StarletteHTTPException, http_exception_handler)
     app.add_exception_handler(RequestValidationError, validation_exception_handler)
     app.add_exception_handler(SQLAlchemyError, sqlalchemy_exception_handler)
     app.add_exception_handler(Exception, generic_exception_handler)
@@ -1,6 +1,6 @@
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 
 from app.config import settings
 from app.logging_config import setup_logging
@@ -22,6 +22,14 @@ from app.routers import (
 )
 from app.agent.router import router as agent_router
 from app.scheduler import start_scheduler, shutdown_scheduler
+from app.services.cache_service import close_redis_client
+from app.services.embedding_service import close_embedding_clients
+from app.services.enhanced_memory_service import (
+    start_memory_worker,
+    stop_memory_worker,
+)
+from app.services.llm_service import llm_service
+from app.utils.timezone import reset_today_memo, set_today_memo
 from app.exceptions import register_exception_handlers
 from app.middleware.security import register_security_middlewares
 from app.monitoring.prometheus import register_prometheus
@@ -30,8 +38,13 @@ from app.monitoring.prometheus import register_prometheus
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     start_scheduler()
+    await start_memory_worker()
     yield
     shutdown_scheduler()
+    await stop_memory_worker()
+    await close_redis_client()
+    await close_embedding_clients()
+    await llm_service.aclose()
 
 
 app = FastAPI(
@@ -53,6 +66,16 @@ register_security_middlewares(
     max_request_size=1024 * 1024,  # 1MB
 )
 
+# 请求内固定"今天"，get_today_local 在单个请求中只换算一次时区
+@app.middleware("http")
+async def memoize_today(request: Request, call_next):
+    token = set_today_memo()
+    try:
+        return await call_next(request)
+    finally:
+        reset_today_memo(token)
+
+
 # 注册异常处理器
 register_exception_handlers(app)
 
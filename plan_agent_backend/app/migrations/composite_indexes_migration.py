@@ -0,0 +1,48 @@
+"""
+数据库迁移 - 为热点查询谓词补齐复合索引
+
+现状核对：
+- execution_logs (user_id, log_date)      已有 ix_execution_logs_user_date
+- tasks (user_id, due_date)               已有 ix_tasks_user_due_date
+- tasks (status, due_date, due_time)      由 due_time_migration 创建
+- reflection_logs (user_id, created_at)   缺失，本迁移补上
+
+使用方法:
+    python -m app.migrations.composite_indexes_migration
+"""
+
+import logging
+
+from sqlalchemy import text
+
+from app.dependencies import engine
+
+logger = logging.getLogger(__name__)
+
+INDEXES = (
+    (
+        "ix_reflection_logs_user_created",
+        "CREATE INDEX IF NOT EXISTS ix_reflection_logs_user_created "
+        "ON reflection_logs (user_id, created_at)",
+    ),
+)
+
+
+def run_migration() -> bool:
+    """创建缺失的复合索引"""
+    try:
+        with engine.connect() as conn:
+            for name, ddl in INDEXES:
+                conn.execute(text(ddl))
+                logger.info(f"{name} ensured")
+            conn.commit()
+            return True
+    except Exception as e:
+        logger.error(f"Failed to create composite indexes: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    success = run_migration()
+    print(f"Migration {'succeeded' if success else 'failed'}")
@@ -0,0 +1,52 @@
+"""
+数据库迁移 - user_memories 增加 content_text 生成列
+
+content 的文本形式改由数据库生成列维护，嵌入重建直接读取，
+不再逐行在 Python 侧序列化 JSONB。
+
+使用方法:
+    python -m app.migrations.content_text_migration
+"""
+
+import logging
+
+from sqlalchemy import text
+
+from app.dependencies import engine
+
+logger = logging.getLogger(__name__)
+
+
+def add_content_text_column() -> bool:
+    """添加 content_text 生成列"""
+    try:
+        with engine.connect() as conn:
+            conn.execute(text(
+                "ALTER TABLE user_memories "
+                "ADD COLUMN IF NOT EXISTS content_text text "
+                "GENERATED ALWAYS AS "
+                "(coalesce(content->>'text', content::text)) STORED"
+            ))
+            conn.commit()
+            logger.info("user_memories.content_text column added")
+            return True
+    except Exception as e:
+        logger.error(f"Failed to add content_text column: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    ok = add_content_text_column()
+
+    print("\n" + "=" * 50)
+    print(f"content_text column added: {ok}")
+    print("=" * 50)
+
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,67 @@
+"""
+数据库迁移 - tasks.due_time 从 VARCHAR(5) 迁移为原生 TIME
+
+"HH:MM" 字符串只是凑巧按字典序可比；原生 TIME 是 8 字节类型化比较，
+且配合 (status, due_date, due_time) 复合索引让推送提醒的范围扫描走索引。
+
+使用方法:
+    python -m app.migrations.due_time_migration
+"""
+
+import logging
+
+from sqlalchemy import text
+
+from app.dependencies import engine
+
+logger = logging.getLogger(__name__)
+
+
+def migrate_due_time_to_time() -> bool:
+    """把 due_time 列类型改为 TIME（空串归一化为 NULL）"""
+    try:
+        with engine.connect() as conn:
+            conn.execute(
+                text(
+                    "ALTER TABLE tasks "
+                    "ALTER COLUMN due_time TYPE time "
+                    "USING NULLIF(due_time, '')::time"
+                )
+            )
+            conn.commit()
+            logger.info("tasks.due_time migrated to native TIME")
+            return True
+    except Exception as e:
+        logger.error(f"Failed to migrate due_time: {e}")
+        return False
+
+
+def create_push_scan_index() -> bool:
+    """创建推送提醒扫描路径的复合索引"""
+    try:
+        with engine.connect() as conn:
+            conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_tasks_status_due_date_time "
+                    "ON tasks (status, due_date, due_time)"
+                )
+            )
+            conn.commit()
+            logger.info("ix_tasks_status_due_date_time created")
+            return True
+    except Exception as e:
+        logger.error(f"Failed to create index: {e}")
+        return False
+
+
+def run_migration() -> bool:
+    """执行完整迁移"""
+    if not migrate_due_time_to_time():
+        return False
+    return create_push_scan_index()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    success = run_migration()
+    print(f"Migration {'succeeded' if success else 'failed'}")
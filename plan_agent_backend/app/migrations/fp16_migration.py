@@ -0,0 +1,85 @@
+"""
+数据库迁移 - 向量存储降精度为 float16
+
+将 memory_embeddings.embedding 中的 float32 字节转换为 float16，
+存储与读取带宽减半。
+
+使用方法:
+    python -m app.migrations.fp16_migration
+"""
+
+import logging
+
+import numpy as np
+from sqlalchemy import text
+
+from app.dependencies import engine
+
+logger = logging.getLogger(__name__)
+
+# text-embedding-3-small 维度
+DIMENSION = 1536
+BATCH_SIZE = 500
+
+
+def migrate_embeddings_to_fp16() -> dict:
+    """将 float32 向量批量转换为 float16"""
+    converted = 0
+    skipped = 0
+
+    with engine.connect() as conn:
+        result = conn.execute(
+            text("SELECT id, embedding FROM memory_embeddings")
+        )
+
+        batch: list[dict] = []
+        for row_id, raw in result:
+            # float32 向量为每维 4 字节；其余视为已迁移
+            if len(raw) != DIMENSION * 4:
+                skipped += 1
+                continue
+
+            fp16 = np.frombuffer(raw, dtype=np.float32).astype(np.float16)
+            batch.append({"id": row_id, "embedding": fp16.tobytes()})
+
+            if len(batch) >= BATCH_SIZE:
+                conn.execute(
+                    text(
+                        "UPDATE memory_embeddings SET embedding = :embedding "
+                        "WHERE id = :id"
+                    ),
+                    batch,
+                )
+                conn.commit()
+                converted += len(batch)
+                batch = []
+
+        if batch:
+            conn.execute(
+                text(
+                    "UPDATE memory_embeddings SET embedding = :embedding "
+                    "WHERE id = :id"
+                ),
+                batch,
+            )
+            conn.commit()
+            converted += len(batch)
+
+    logger.info(f"fp16 migration done: {converted} converted, {skipped} skipped")
+    return {"converted": converted, "skipped": skipped}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    results = migrate_embeddings_to_fp16()
+
+    print("\n" + "=" * 50)
+    print("Migration Results:")
+    print("=" * 50)
+    print(f"Converted: {results['converted']}")
+    print(f"Skipped (already fp16): {results['skipped']}")
+    print("=" * 50)
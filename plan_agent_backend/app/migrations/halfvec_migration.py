@@ -0,0 +1,109 @@
+"""
+数据库迁移 - memory_embeddings.embedding 从 BYTEA 迁移为 halfvec
+
+BYTEA 里的原始 numpy 字节无法参与 pgvector 距离运算；halfvec(1536)
+既让 <#> 真正可用，也把每行向量字节数相对 fp32 vector 减半。
+
+bytea 到 halfvec 没有 SQL 级转换，采用加列-回填-换列三步：
+先加 halfvec 新列，Python 端解码旧字节批量回填，再删旧列改名。
+
+使用方法:
+    python -m app.migrations.halfvec_migration
+"""
+
+import logging
+
+import numpy as np
+from sqlalchemy import text
+
+from app.dependencies import engine
+from app.models_memory import EMBEDDING_DIMENSION
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def _decode(raw: bytes) -> np.ndarray:
+    """解码历史字节格式 (fp32 或 fp16)"""
+    if len(raw) == EMBEDDING_DIMENSION * 4:
+        return np.frombuffer(raw, dtype=np.float32)
+    return np.frombuffer(raw, dtype=np.float16).astype(np.float32)
+
+
+def migrate_to_halfvec() -> dict:
+    """执行 BYTEA -> halfvec 迁移"""
+    converted = 0
+    skipped = 0
+
+    with engine.connect() as conn:
+        col_type = conn.execute(text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_name = 'memory_embeddings' AND column_name = 'embedding'"
+        )).scalar()
+        if col_type != "bytea":
+            logger.info(f"embedding column is already {col_type}, nothing to do")
+            return {"converted": 0, "skipped": 0, "already_migrated": True}
+
+        conn.execute(text(
+            "ALTER TABLE memory_embeddings "
+            f"ADD COLUMN IF NOT EXISTS embedding_new halfvec({EMBEDDING_DIMENSION})"
+        ))
+        conn.commit()
+
+        result = conn.execute(text("SELECT id, embedding FROM memory_embeddings"))
+
+        batch: list[dict] = []
+        for row_id, raw in result:
+            arr = _decode(raw)
+            if arr.shape[0] != EMBEDDING_DIMENSION:
+                skipped += 1
+                continue
+            norm = np.linalg.norm(arr)
+            if norm > 0:
+                arr = arr / norm
+            literal = "[" + ",".join(map(str, arr.tolist())) + "]"
+            batch.append({"id": row_id, "v": literal})
+
+            if len(batch) >= BATCH_SIZE:
+                conn.execute(
+                    text(
+                        "UPDATE memory_embeddings "
+                        f"SET embedding_new = :v::halfvec({EMBEDDING_DIMENSION}) "
+                        "WHERE id = :id"
+                    ),
+                    batch,
+                )
+                conn.commit()
+                converted += len(batch)
+                batch = []
+
+        if batch:
+            conn.execute(
+                text(
+                    "UPDATE memory_embeddings "
+                    f"SET embedding_new = :v::halfvec({EMBEDDING_DIMENSION}) "
+                    "WHERE id = :id"
+                ),
+                batch,
+            )
+            conn.commit()
+            converted += len(batch)
+
+        conn.execute(text("ALTER TABLE memory_embeddings DROP COLUMN embedding"))
+        conn.execute(text(
+            "ALTER TABLE memory_embeddings RENAME COLUMN embedding_new TO embedding"
+        ))
+        conn.execute(text(
+            "ALTER TABLE memory_embeddings ALTER COLUMN embedding SET NOT NULL"
+        ))
+        conn.commit()
+
+    logger.info(f"halfvec migration done: {converted} converted, {skipped} skipped")
+    return {"converted": converted, "skipped": skipped, "already_migrated": False}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    results = migrate_to_halfvec()
+    print(f"Converted: {results['converted']}, skipped: {results['skipped']}")
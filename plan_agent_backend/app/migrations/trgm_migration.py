@@ -0,0 +1,79 @@
+"""
+数据库迁移 - 记忆关键词搜索的 trigram 索引
+
+为 user_memories.content (转 text) 创建 pg_trgm GIN 索引，
+使 ILIKE '%kw%' 关键词搜索从全表顺序扫描变为索引查找。
+
+使用方法:
+    python -m app.migrations.trgm_migration
+"""
+
+import logging
+
+from sqlalchemy import text
+
+from app.dependencies import engine
+
+logger = logging.getLogger(__name__)
+
+
+def enable_pg_trgm_extension() -> bool:
+    """启用 pg_trgm 扩展"""
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.commit()
+            logger.info("pg_trgm extension enabled")
+            return True
+    except Exception as e:
+        logger.error(f"Failed to enable pg_trgm: {e}")
+        return False
+
+
+def create_content_trgm_index() -> bool:
+    """创建 content trigram 索引"""
+    try:
+        with engine.connect() as conn:
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS user_memories_content_trgm "
+                "ON user_memories USING gin ((content::text) gin_trgm_ops)"
+            ))
+            conn.commit()
+            logger.info("user_memories_content_trgm index created")
+            return True
+    except Exception as e:
+        logger.error(f"Failed to create trigram index: {e}")
+        return False
+
+
+def run_migration() -> dict:
+    """运行 trigram 迁移"""
+    results = {
+        "pg_trgm_enabled": enable_pg_trgm_extension(),
+        "index_created": False,
+    }
+
+    if results["pg_trgm_enabled"]:
+        results["index_created"] = create_content_trgm_index()
+
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    results = run_migration()
+
+    print("\n" + "=" * 50)
+    print("Migration Results:")
+    print("=" * 50)
+    print(f"pg_trgm enabled: {results['pg_trgm_enabled']}")
+    print(f"Index created: {results['index_created']}")
+    print("=" * 50)
+
+    sys.exit(0 if all(results.values()) else 1)
@@ -0,0 +1,39 @@
+"""
+数据库迁移 - word_banks.tags 加 GIN 索引
+
+每日单词抽样按标签重叠 (&&) 过滤；GIN 数组索引让该谓词走索引
+而不是全表扫描每行的 tags 数组。
+
+使用方法:
+    python -m app.migrations.word_tags_gin_migration
+"""
+
+import logging
+
+from sqlalchemy import text
+
+from app.dependencies import engine
+
+logger = logging.getLogger(__name__)
+
+
+def run_migration() -> bool:
+    """创建 tags 的 GIN 索引"""
+    try:
+        with engine.connect() as conn:
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_word_bank_tags_gin "
+                "ON word_banks USING gin (tags)"
+            ))
+            conn.commit()
+            logger.info("ix_word_bank_tags_gin ensured")
+            return True
+    except Exception as e:
+        logger.error(f"Failed to create GIN index: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    success = run_migration()
+    print(f"Migration {'succeeded' if success else 'failed'}")
@@ -0,0 +1,48 @@
+"""
+数据库迁移 - word_banks.word 加唯一索引
+
+导入脚本用 ON CONFLICT DO NOTHING 做数据库端去重，需要 word 上的
+唯一索引。先清理历史重复行（保留 id 最小的一条），再建索引。
+
+注意: 若 daily_word_tasks.word_ids 引用了被清理的重复行，这些 ID
+会失效；get_words_by_ids 本身容忍缺失 ID，不会报错。
+
+使用方法:
+    python -m app.migrations.word_unique_migration
+"""
+
+import logging
+
+from sqlalchemy import text
+
+from app.dependencies import engine
+
+logger = logging.getLogger(__name__)
+
+
+def run_migration() -> bool:
+    """清理重复单词并创建唯一索引"""
+    try:
+        with engine.connect() as conn:
+            result = conn.execute(text(
+                "DELETE FROM word_banks a USING word_banks b "
+                "WHERE a.word = b.word AND a.id > b.id"
+            ))
+            logger.info(f"Removed {result.rowcount} duplicate words")
+
+            conn.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ix_word_banks_word "
+                "ON word_banks (word)"
+            ))
+            conn.commit()
+            logger.info("ix_word_banks_word ensured")
+            return True
+    except Exception as e:
+        logger.error(f"Failed to create unique word index: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    success = run_migration()
+    print(f"Migration {'succeeded' if success else 'failed'}")
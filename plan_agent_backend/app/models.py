@@ -1,17 +1,26 @@
-from datetime import datetime, date
+from datetime import datetime, date, time
 from sqlalchemy import (
+    JSON,
     String,
     Integer,
     Text,
     Boolean,
     DateTime,
     Date,
+    Time,
+    Computed,
     ForeignKey,
     Index,
 )
 from sqlalchemy.dialects.postgresql import JSONB, ARRAY
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
+# SQLite (测试环境的内存库) 不支持 PG 专有类型，按方言降级:
+# JSONB -> JSON，数组列 -> JSON 存普通列表；PG 上仍是原生类型
+_JSONB = JSONB().with_variant(JSON(), "sqlite")
+_StrArray = ARRAY(String).with_variant(JSON(), "sqlite")
+_IntArray = ARRAY(Integer).with_variant(JSON(), "sqlite")
+
 # 使用 timezone 工具获取 UTC 时间
 import app.utils.timezone as tz
 
@@ -27,7 +36,7 @@ class User(Base):
     username: Mapped[str] = mapped_column(String(80), unique=True, nullable=False)
     password_hash: Mapped[str] = mapped_column(String(128), nullable=False)
     push_token: Mapped[str | None] = mapped_column(String(255), nullable=True)
-    preferences: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    preferences: Mapped[dict | None] = mapped_column(_JSONB, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=tz.get_utc_now)
 
     friendships_as_user: Mapped[list["Friendship"]] = relationship(
@@ -100,7 +109,7 @@ class FixedSchedule(Base):
     day_of_week: Mapped[int] = mapped_column(Integer, nullable=False)
     start_time: Mapped[str] = mapped_column(String(5), nullable=False)
     end_time: Mapped[str] = mapped_column(String(5), nullable=False)
-    repeat_rule: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    repeat_rule: Mapped[dict | None] = mapped_column(_JSONB, nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=tz.get_utc_now)
 
@@ -117,7 +126,7 @@ class Goal(Base):
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
     start_date: Mapped[date] = mapped_column(Date, nullable=False)
     end_date: Mapped[date] = mapped_column(Date, nullable=False)
-    outline: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    outline: Mapped[dict | None] = mapped_column(_JSONB, nullable=True)
     status: Mapped[str] = mapped_column(String(20), default="active")
     current_phase: Mapped[str | None] = mapped_column(String(100), nullable=True)
     objective_topic: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -149,10 +158,11 @@ class Task(Base):
     title: Mapped[str] = mapped_column(String(200), nullable=False)
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
     due_date: Mapped[date] = mapped_column(Date, nullable=False)
-    due_time: Mapped[str | None] = mapped_column(String(5), nullable=True)
+    # 原生 TIME 列：类型化比较可走索引，比 "HH:MM" 字符串的逐行比较快
+    due_time: Mapped[time | None] = mapped_column(Time, nullable=True)
     status: Mapped[str] = mapped_column(String(20), default="pending")
     priority: Mapped[int] = mapped_column(Integer, default=1)
-    dependencies: Mapped[list | None] = mapped_column(JSONB, nullable=True)
+    dependencies: Mapped[list | None] = mapped_column(_JSONB, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=tz.get_utc_now)
 
     user: Mapped["User"] = relationship("User", back_populates="tasks")
@@ -164,7 +174,11 @@ class Task(Base):
         "TaskComment", back_populates="task", cascade="all, delete-orphan"
     )
 
-    __table_args__ = (Index("ix_tasks_user_due_date", "user_id", "due_date"),)
+    __table_args__ = (
+        Index("ix_tasks_user_due_date", "user_id", "due_date"),
+        # 推送提醒的扫描路径：status = 'pending' AND due_date = today AND due_time BETWEEN ...
+        Index("ix_tasks_status_due_date_time", "status", "due_date", "due_time"),
+    )
 
 
 class TaskComment(Base):
@@ -187,8 +201,15 @@ class UserMemory(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
     memory_type: Mapped[str] = mapped_column(String(50), nullable=False)
-    content: Mapped[dict] = mapped_column(JSONB, nullable=False)
-    context: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    content: Mapped[dict] = mapped_column(_JSONB, nullable=False)
+    # content 的文本形式，由数据库生成列维护，供嵌入生成直接读取
+    content_text: Mapped[str | None] = mapped_column(
+        Text,
+        # CAST 写法与 PG 的 content::text 等价，SQLite 也能解析
+        Computed("coalesce(content->>'text', CAST(content AS TEXT))", persisted=True),
+        nullable=True,
+    )
+    context: Mapped[dict | None] = mapped_column(_JSONB, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=tz.get_utc_now)
 
     user: Mapped["User"] = relationship("User", back_populates="memories")
@@ -203,7 +224,7 @@ class AISession(Base):
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
     goal_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("goals.id"), nullable=True)
     state: Mapped[str] = mapped_column(String(50), nullable=False)
-    data: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    data: Mapped[dict | None] = mapped_column(_JSONB, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=tz.get_utc_now)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, default=tz.get_utc_now, onupdate=tz.get_utc_now
@@ -240,14 +261,18 @@ class ReflectionLog(Base):
     goal_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("goals.id"), nullable=True)
     reflection_time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     analysis: Mapped[str | None] = mapped_column(Text, nullable=True)
-    adjustment_plan: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    adjustment_plan: Mapped[dict | None] = mapped_column(_JSONB, nullable=True)
     applied: Mapped[bool] = mapped_column(Boolean, default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=tz.get_utc_now)
 
     user: Mapped["User"] = relationship("User", back_populates="reflection_logs")
     goal: Mapped["Goal | None"] = relationship("Goal", back_populates="reflection_logs")
 
-    __table_args__ = (Index("ix_reflection_logs_user_goal", "user_id", "goal_id"),)
+    __table_args__ = (
+        Index("ix_reflection_logs_user_goal", "user_id", "goal_id"),
+        # get_reflection_logs 按 user_id 过滤后按 created_at 倒序取最近 N 条
+        Index("ix_reflection_logs_user_created", "user_id", "created_at"),
+    )
 
 
 class WordBank(Base):
@@ -256,15 +281,18 @@ class WordBank(Base):
     __tablename__ = "word_banks"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    word: Mapped[str] = mapped_column(String(100), nullable=False)
+    # 唯一索引支撑导入时的 ON CONFLICT DO NOTHING 去重
+    word: Mapped[str] = mapped_column(
+        String(100), nullable=False, unique=True, index=True
+    )
     pronunciation: Mapped[str | None] = mapped_column(String(200), nullable=True)
     translation: Mapped[str] = mapped_column(Text, nullable=False)
     part_of_speech: Mapped[str | None] = mapped_column(String(50), nullable=True)
-    examples: Mapped[list | None] = mapped_column(JSONB, nullable=True)
+    examples: Mapped[list | None] = mapped_column(_JSONB, nullable=True)
     audio_url_en: Mapped[str | None] = mapped_column(String(255), nullable=True)
     audio_url_zh: Mapped[str | None] = mapped_column(String(255), nullable=True)
     difficulty: Mapped[int] = mapped_column(Integer, default=1)
-    tags: Mapped[list[str] | None] = mapped_column(ARRAY(String), nullable=True)
+    tags: Mapped[list[str] | None] = mapped_column(_StrArray, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=tz.get_utc_now)
 
 
@@ -275,7 +303,7 @@ class UserWordSettings(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
-    selected_tags: Mapped[list[str] | None] = mapped_column(ARRAY(String), nullable=True)
+    selected_tags: Mapped[list[str] | None] = mapped_column(_StrArray, nullable=True)
     daily_count: Mapped[int] = mapped_column(Integer, default=10)
     repeat_en: Mapped[int] = mapped_column(Integer, default=2)
     repeat_zh: Mapped[int] = mapped_column(Integer, default=1)
@@ -297,7 +325,7 @@ class DailyWordTask(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
     task_date: Mapped[date] = mapped_column(Date, nullable=False)
-    word_ids: Mapped[list[int]] = mapped_column(ARRAY(Integer), nullable=False)
+    word_ids: Mapped[list[int]] = mapped_column(_IntArray, nullable=False)
     completed_count: Mapped[int] = mapped_column(Integer, default=0)
     status: Mapped[str] = mapped_column(String(20), default="pending")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=tz.get_utc_now)
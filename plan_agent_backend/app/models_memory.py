@@ -5,11 +5,30 @@ PostgreSQL 向量记忆模型
 """
 from datetime import datetime
 from sqlalchemy import Integer, String, DateTime, ForeignKey, Index, func
-from sqlalchemy.dialects.postgresql import BYTEA
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.types import UserDefinedType
 
 from app.models import Base, User, UserMemory
 
+# text-embedding-3-small 维度
+EMBEDDING_DIMENSION = 1536
+
+
+class HalfVec(UserDefinedType):
+    """pgvector 的 halfvec 列类型 (fp16)
+
+    只声明 DDL 类型，绑定值用 pgvector 文本字面量 "[x,y,...]"，
+    不引入 pgvector Python 包依赖。
+    """
+
+    cache_ok = True
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def get_col_spec(self, **kw) -> str:
+        return f"halfvec({self.dim})"
+
 
 class MemoryEmbedding(Base):
     """
@@ -33,8 +52,11 @@ class MemoryEmbedding(Base):
         index=True
     )
     
-    # 向量存储为字节 (pgvector 的 vector(1536))
-    embedding: Mapped[bytes] = mapped_column(BYTEA, nullable=False)
+    # 向量以 halfvec(1536) 存储：相比 fp32 vector 每行字节数减半，
+    # 顺序扫描与索引遍历的内存带宽随之减半
+    embedding: Mapped[str] = mapped_column(
+        HalfVec(EMBEDDING_DIMENSION), nullable=False
+    )
     
     # 用于快速过滤
     memory_type: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
@@ -1,4 +1,7 @@
+import json
+
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Any, Optional
 from datetime import datetime
@@ -147,6 +150,42 @@ async def continue_plan(
     )
 
 
+@router.post("/preview-plan/stream")
+async def preview_plan_stream(
+    request: ConfirmPlanRequest,
+    current_user: User = Depends(get_current_user),
+):
+    session = ai_dialogue_manager.get_session(request.session_id, current_user.id)
+
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found or access denied",
+        )
+
+    current_state = DialogueState(session.state)
+
+    if current_state != DialogueState.AWAITING_CONFIRMATION:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Session is not in confirmation state",
+        )
+
+    session_data = session.data or {}
+
+    async def event_stream():
+        async for event in ai_dialogue_manager.generate_plan_preview_stream(
+            session_data
+        ):
+            if event["type"] == "complete":
+                session_data["preview"] = event["data"]
+                ai_dialogue_manager.update_session(session, session_data)
+            payload = json.dumps(event["data"], ensure_ascii=False)
+            yield f"event: {event['type']}\ndata: {payload}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @router.get("/session/{session_id}")
 async def get_session(
     session_id: int,
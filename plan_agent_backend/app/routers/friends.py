@@ -6,6 +6,7 @@ from sqlalchemy.orm import joinedload
 
 from app.dependencies import get_current_user, SessionLocal
 from app.models import User, Friendship, Task
+from app.utils.timezone import format_hhmm
 
 
 class FriendRequest(BaseModel):
@@ -370,7 +371,7 @@ async def get_friend_tasks(
                 title=t.title,
                 description=t.description,
                 due_date=t.due_date,
-                due_time=t.due_time,
+                due_time=format_hhmm(t.due_time),
                 status=t.status,
                 priority=t.priority,
             ) for t in tasks],
@@ -9,6 +9,7 @@ from app.schemas import TaskCreate, TaskUpdate, TaskInDB
 from app.services.execution_service import execution_service
 from app.utils.enums import TaskStatus, TaskPriority
 from app.utils.sanitize import sanitize_input
+from app.utils.timezone import format_hhmm, parse_hhmm
 
 
 class TaskResponse(BaseModel):
@@ -25,6 +26,11 @@ class TaskResponse(BaseModel):
     dependencies: Optional[List[int]] = None
     created_at: datetime
 
+    @field_validator("due_time", mode="before")
+    @classmethod
+    def _format_due_time(cls, v):
+        return format_hhmm(v)
+
     class Config:
         from_attributes = True
 
@@ -61,7 +67,7 @@ async def create_task(
             title=sanitize_input(task_data.title, max_length=200),
             description=sanitize_input(task_data.description) if task_data.description else None,
             due_date=task_data.due_date,
-            due_time=task_data.due_time,
+            due_time=parse_hhmm(task_data.due_time),
             status=TaskStatus.PENDING.value,
             priority=task_data.priority if TaskPriority.is_valid(task_data.priority) else TaskPriority.MEDIUM.value,
             dependencies=task_data.dependencies,
@@ -187,6 +193,8 @@ async def update_task(
         for field, value in update_data.items():
             if field in ["title", "description"] and value:
                 value = sanitize_input(value, max_length=200 if field == "title" else None)
+            elif field == "due_time":
+                value = parse_hhmm(value)
             setattr(task, field, value)
 
         db.commit()
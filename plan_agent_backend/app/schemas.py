@@ -8,6 +8,8 @@ from typing import Optional, List
 from datetime import datetime, date
 import re
 
+from app.utils.timezone import format_hhmm
+
 
 class HealthResponse(BaseModel):
     status: str
@@ -67,6 +69,13 @@ class TaskCreate(TaskBase):
     due_time: Optional[str] = Field(default=None, description="Due time (HH:MM)")
     dependencies: Optional[List[int]] = Field(default=None, description="Predecessor task IDs")
 
+    @field_validator('due_time')
+    @classmethod
+    def validate_time_format(cls, v: Optional[str]) -> Optional[str]:
+        if v is not None and not re.match(r'^([01]?[0-9]|2[0-3]):([0-5][0-9])$', v):
+            raise ValueError('Time must be in HH:MM format')
+        return v
+
 
 class TaskUpdate(BaseModel):
     title: Optional[str] = None
@@ -76,6 +85,13 @@ class TaskUpdate(BaseModel):
     due_date: Optional[date] = None
     due_time: Optional[str] = None
 
+    @field_validator('due_time')
+    @classmethod
+    def validate_time_format(cls, v: Optional[str]) -> Optional[str]:
+        if v is not None and not re.match(r'^([01]?[0-9]|2[0-3]):([0-5][0-9])$', v):
+            raise ValueError('Time must be in HH:MM format')
+        return v
+
 
 class TaskInDB(TaskBase):
     id: int
@@ -88,6 +104,12 @@ class TaskInDB(TaskBase):
     dependencies: Optional[List[int]]
     created_at: datetime
 
+    # ORM 侧 due_time 是 datetime.time，API 仍输出 "HH:MM"
+    @field_validator("due_time", mode="before")
+    @classmethod
+    def _format_due_time(cls, v):
+        return format_hhmm(v)
+
     class Config:
         from_attributes = True
 
@@ -1,6 +1,7 @@
 import json
+from collections.abc import AsyncIterator
 from enum import Enum
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
 
 from app.config import settings
@@ -150,10 +151,10 @@ class AIDialogueManager:
 
         return None
 
-    async def generate_plan_preview(self, session_data: dict) -> dict:
+    def _build_preview_prompt(self, session_data: dict) -> str:
         answers = session_data.get("answers", {})
 
-        prompt = f"""
+        return f"""
 Based on the following user input, generate a learning plan preview:
 
 ## User Answers:
@@ -197,14 +198,42 @@ Please generate a JSON response with the following structure:
 }}
 """
 
+    PREVIEW_SYSTEM_PROMPT = (
+        "You are an expert learning plan designer. "
+        "Generate structured plans in JSON format."
+    )
+
+    @staticmethod
+    def _extract_partial_field(buffer: str, field: str):
+        """尝试从未完成的 JSON 缓冲区中解析出指定顶层字段的值。
+
+        字段值尚未完整时返回 None，由调用方在收到更多数据后重试。
+        """
+        marker = f'"{field}"'
+        start = buffer.find(marker)
+        if start == -1:
+            return None
+        colon = buffer.find(":", start + len(marker))
+        if colon == -1:
+            return None
+        # raw_decode 不接受起始位置是空白；跳过冒号后的空白
+        # (美化输出的 JSON 冒号后通常有空格或换行)
+        idx = colon + 1
+        while idx < len(buffer) and buffer[idx] in " \t\r\n":
+            idx += 1
+        try:
+            value, _ = json.JSONDecoder().raw_decode(buffer, idx)
+            return value
+        except ValueError:
+            return None
+
+    async def generate_plan_preview(self, session_data: dict) -> dict:
+        prompt = self._build_preview_prompt(session_data)
+
         try:
             response = await llm_service.chat_raw(
-                
                 messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert learning plan designer. Generate structured plans in JSON format.",
-                    },
+                    {"role": "system", "content": self.PREVIEW_SYSTEM_PROMPT},
                     {"role": "user", "content": prompt},
                 ],
                 temperature=0.7,
@@ -222,6 +251,56 @@ Please generate a JSON response with the following structure:
                 "summary": "计划生成失败，请稍后重试",
             }
 
+    async def generate_plan_preview_stream(
+        self, session_data: dict
+    ) -> AsyncIterator[dict]:
+        """流式生成计划预览。
+
+        使用 LLM 流式响应增量解析 JSON：goal / outline 一旦完整即先行
+        产出，不必等待 preview_tasks 全部生成，显著降低首屏延迟。
+        流中断时回退到已缓冲内容的整体解析。
+        """
+        prompt = self._build_preview_prompt(session_data)
+        buffer = ""
+        emitted: set[str] = set()
+
+        try:
+            stream = await llm_service.chat_raw(
+                messages=[
+                    {"role": "system", "content": self.PREVIEW_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+                temperature=0.7,
+                response_format={"type": "json_object"},
+                stream=True,
+            )
+
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                buffer += delta
+
+                for field in ("goal", "outline"):
+                    if field in emitted:
+                        continue
+                    value = self._extract_partial_field(buffer, field)
+                    if value is not None:
+                        emitted.add(field)
+                        yield {"type": field, "data": value}
+
+            preview = json.loads(buffer)
+        except Exception as e:
+            # 流中断或 JSON 不完整：回退到非流式整体生成
+            try:
+                preview = json.loads(buffer)
+            except ValueError:
+                preview = await self.generate_plan_preview(session_data)
+            if "error" not in preview:
+                preview.setdefault("stream_error", str(e))
+
+        yield {"type": "complete", "data": preview}
+
     def create_session(
         self, user_id: int, initial_input: str | None = None
     ) -> AISession:
@@ -275,18 +354,17 @@ Please generate a JSON response with the following structure:
     ) -> Goal:
         goal_data = preview.get("goal", {})
 
+        sd = goal_data.get("start_date")
+        start_date = date.fromisoformat(sd) if sd else date.today()
+        ed = goal_data.get("end_date")
+        end_date = date.fromisoformat(ed) if ed else start_date + timedelta(days=30)
+
         goal = Goal(
             user_id=user_id,
             title=goal_data.get("title", "学习计划"),
             description=goal_data.get("description", ""),
-            start_date=datetime.strptime(
-                goal_data.get("start_date", datetime.now().strftime("%Y-%m-%d")),
-                "%Y-%m-%d"
-            ).date(),
-            end_date=datetime.strptime(
-                goal_data.get("end_date", (datetime.now() + __import__('datetime').timedelta(days=30)).strftime("%Y-%m-%d")),
-                "%Y-%m-%d"
-            ).date(),
+            start_date=start_date,
+            end_date=end_date,
             outline=preview.get("outline"),
             status="active",
             objective_topic=goal_data.get("objective_topic"),
@@ -309,12 +387,12 @@ Please generate a JSON response with the following structure:
         self, goal_id: int, user_id: int, preview_tasks: list
     ) -> list[Task]:
         tasks = []
-        today = datetime.now().date()
+        today = date.today()
 
         with SessionLocal() as db:
             for i, task_data in enumerate(preview_tasks):
                 week = task_data.get("week", 1)
-                due_date = today + __import__('datetime').timedelta(weeks=week)
+                due_date = today + timedelta(weeks=week)
 
                 task = Task(
                     user_id=user_id,
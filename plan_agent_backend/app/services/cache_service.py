@@ -4,10 +4,12 @@ Redis 缓存服务
 提供分布式缓存能力，用于用户会话、热点数据等。
 """
 
-import json
 import logging
 from typing import Any, Optional
 
+import msgpack
+from cachetools import TTLCache
+
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -27,12 +29,21 @@ def get_redis_client():
         try:
             import redis.asyncio as redis
 
-            _redis_client = redis.from_url(
+            # 显式配置连接池：池满时阻塞等待而非报错，
+            # 全进程共享同一个池。值为 msgpack 二进制，不能按 UTF-8 解码
+            pool = redis.BlockingConnectionPool.from_url(
                 settings.REDIS_URL,
-                encoding="utf-8",
-                decode_responses=True,
+                max_connections=settings.REDIS_POOL_SIZE,
+                timeout=5,
+                decode_responses=False,
+                socket_keepalive=True,
+                health_check_interval=30,
+            )
+            _redis_client = redis.Redis(connection_pool=pool)
+            logger.info(
+                f"Redis client initialized: {settings.REDIS_URL} "
+                f"(pool size {settings.REDIS_POOL_SIZE})"
             )
-            logger.info(f"Redis client initialized: {settings.REDIS_URL}")
         except Exception as e:
             logger.error(f"Failed to initialize Redis: {e}")
             return None
@@ -40,6 +51,18 @@ def get_redis_client():
     return _redis_client
 
 
+async def close_redis_client():
+    """关闭 Redis 连接池 (应用关闭时调用)"""
+    global _redis_client
+
+    if _redis_client is not None:
+        try:
+            await _redis_client.aclose()
+        except Exception as e:
+            logger.warning(f"Error closing Redis client: {e}")
+        _redis_client = None
+
+
 class CacheService:
     """
     缓存服务
@@ -60,6 +83,12 @@ class CacheService:
     def __init__(self):
         self._client = None
         self._enabled = settings.REDIS_ENABLED
+        # 进程内一级缓存：吸收同一键在短窗口内的重复 Redis 查询
+        self._local: Optional[TTLCache] = (
+            TTLCache(maxsize=10_000, ttl=settings.LOCAL_CACHE_TTL)
+            if settings.LOCAL_CACHE_TTL > 0
+            else None
+        )
 
     @property
     def client(self):
@@ -70,29 +99,35 @@ class CacheService:
             self._client = get_redis_client()
         return self._client
 
-    def _serialize(self, value: Any) -> str:
-        """序列化值"""
-        if isinstance(value, (str, int, float, bool)):
-            return str(value)
-        return json.dumps(value, ensure_ascii=False)
+    def _serialize(self, value: Any) -> bytes:
+        """序列化值 (msgpack 二进制，比 JSON 更快更小)"""
+        return msgpack.packb(value, use_bin_type=True)
 
-    def _deserialize(self, value: Optional[str]) -> Any:
+    def _deserialize(self, value: Optional[bytes]) -> Any:
         """反序列化值"""
-        if value is None:
-            return None
+        # 空值短路：不值得进 unpackb/异常机制
+        if not value:
+            return None if value is None else ""
         try:
-            return json.loads(value)
-        except (json.JSONDecodeError, TypeError):
-            return value
+            return msgpack.unpackb(value, raw=False)
+        except (msgpack.exceptions.ExtraData, msgpack.exceptions.UnpackException, ValueError):
+            # 旧格式 (JSON/纯文本) 残留的键：按字符串返回
+            return value.decode("utf-8", errors="replace")
 
     async def get(self, key: str) -> Optional[Any]:
         """获取缓存值"""
         if not self.client:
             return None
 
+        if self._local is not None and key in self._local:
+            return self._local[key]
+
         try:
             value = await self.client.get(key)
-            return self._deserialize(value)
+            result = self._deserialize(value)
+            if self._local is not None and result is not None:
+                self._local[key] = result
+            return result
         except Exception as e:
             logger.error(f"Cache get error: {key} - {e}")
             return None
@@ -111,6 +146,8 @@ class CacheService:
             serialized = self._serialize(value)
             expire = ttl or settings.CACHE_TTL_DEFAULT
             await self.client.setex(key, expire, serialized)
+            if self._local is not None:
+                self._local.pop(key, None)
             return True
         except Exception as e:
             logger.error(f"Cache set error: {key} - {e}")
@@ -123,6 +160,8 @@ class CacheService:
 
         try:
             await self.client.delete(key)
+            if self._local is not None:
+                self._local.pop(key, None)
             return True
         except Exception as e:
             logger.error(f"Cache delete error: {key} - {e}")
@@ -149,6 +188,43 @@ class CacheService:
         key = f"{self.PREFIX_USER}{user_id}"
         return await self.set(key, user_data, ttl)
 
+    async def get_users(self, user_ids: list[int]) -> dict[int, dict]:
+        """批量获取用户缓存 (单次 MGET，N 次 RTT 降为 1)"""
+        if not self.client or not user_ids:
+            return {}
+
+        keys = [f"{self.PREFIX_USER}{uid}" for uid in user_ids]
+        try:
+            values = await self.client.mget(keys)
+        except Exception as e:
+            logger.error(f"Cache mget error: {len(keys)} keys - {e}")
+            return {}
+
+        return {
+            uid: self._deserialize(value)
+            for uid, value in zip(user_ids, values)
+            if value is not None
+        }
+
+    async def set_users(
+        self, users: dict[int, dict], ttl: int = 300
+    ) -> bool:
+        """批量设置用户缓存 (单个 pipeline)"""
+        if not self.client or not users:
+            return False
+
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for uid, user_data in users.items():
+                    pipe.setex(
+                        f"{self.PREFIX_USER}{uid}", ttl, self._serialize(user_data)
+                    )
+                await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Cache mset error: {len(users)} keys - {e}")
+            return False
+
     async def delete_user(self, user_id: int) -> bool:
         """删除用户缓存"""
         key = f"{self.PREFIX_USER}{user_id}"
@@ -196,14 +272,19 @@ class CacheService:
         ]
 
         deleted = []
-        for pattern in patterns:
-            try:
-                keys = await self.client.keys(pattern)
-                if keys:
-                    await self.client.delete(*keys)
-                    deleted.extend(keys)
-            except Exception as e:
-                logger.error(f"Cache invalidate error: {pattern} - {e}")
+        try:
+            # SCAN 增量遍历避免 KEYS 阻塞服务端，删除合并进单个 pipeline
+            for pattern in patterns:
+                async for key in self.client.scan_iter(match=pattern, count=500):
+                    deleted.append(key)
+
+            if deleted:
+                async with self.client.pipeline(transaction=False) as pipe:
+                    for i in range(0, len(deleted), 500):
+                        pipe.delete(*deleted[i : i + 500])
+                    await pipe.execute()
+        except Exception as e:
+            logger.error(f"Cache invalidate error: user {user_id} - {e}")
 
         return deleted
 
@@ -3,10 +3,13 @@
 
 支持配置多个 Embedding API 提供商，当一个失败时自动切换到下一个。
 """
+import asyncio
+import hashlib
 import json
 import logging
 from typing import Any
 
+import httpx
 import numpy as np
 from openai import AsyncOpenAI, APIError, RateLimitError, APITimeoutError
 
@@ -15,25 +18,57 @@ from app.utils.timezone import get_utc_now
 
 logger = logging.getLogger(__name__)
 
+# (url, key) -> AsyncOpenAI，同一端点的提供商共享 HTTP 连接池
+_shared_clients: dict[tuple[str, str], AsyncOpenAI] = {}
+
+
+def _get_shared_client(url: str, key: str) -> AsyncOpenAI:
+    """按 (url, key) 复用 AsyncOpenAI 客户端"""
+    client = _shared_clients.get((url, key))
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=key,
+            base_url=url,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=100, max_keepalive_connections=50
+                )
+            ),
+        )
+        _shared_clients[(url, key)] = client
+    return client
+
+
+async def close_embedding_clients():
+    """停止微批工作协程并关闭所有共享客户端 (应用关闭时调用)"""
+    task = embedding_service._batch_task
+    if task is not None and not task.done():
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    embedding_service._batch_task = None
+    embedding_service._batch_loop = None
+
+    while _shared_clients:
+        _, client = _shared_clients.popitem()
+        try:
+            await client.close()
+        except Exception as e:
+            logger.warning(f"Error closing embedding client: {e}")
+
 
 class EmbeddingProvider:
     """单个 Embedding API 提供商"""
-    
+
     def __init__(self, url: str, key: str, model: str, name: str = None):
         self.url = url
         self.key = key
         self.model = model
         self.name = name or url
-        self.client = None
-        self._init_client()
-    
-    def _init_client(self):
-        """初始化客户端"""
-        self.client = AsyncOpenAI(
-            api_key=self.key,
-            base_url=self.url,
-        )
-    
+        self.client = _get_shared_client(url, key)
+
     def __repr__(self):
         return f"<Provider: {self.name}, model: {self.model}>"
 
@@ -47,9 +82,20 @@ class MultiProviderEmbeddingService:
     
     # 默认维度 (text-embedding-3-small)
     DIMENSION = 1536
+
+    # Redis 向量缓存
+    CACHE_PREFIX = "emb:"
+    CACHE_TTL = 7 * 24 * 3600  # 7 天
+
+    # 单文本请求合批上限
+    MAX_BATCH = 64
     
     def __init__(self):
         self.providers: list[EmbeddingProvider] = []
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._batch_queue: asyncio.Queue | None = None
+        self._batch_task: asyncio.Task | None = None
+        self._batch_loop: asyncio.AbstractEventLoop | None = None
         self._init_providers()
     
     def _init_providers(self):
@@ -110,21 +156,26 @@ class MultiProviderEmbeddingService:
         provider: EmbeddingProvider, 
         texts: list[str],
         single: bool = False,
-    ) -> list[list[float]]:
-        """调用单个提供商"""
+    ) -> np.ndarray:
+        """调用单个提供商，返回 (N, DIMENSION) float32 矩阵"""
         try:
             if single:
                 response = await provider.client.embeddings.create(
                     model=provider.model,
                     input=texts[0],
                 )
-                return [response.data[0].embedding]
+                data = [response.data[0]]
             else:
                 response = await provider.client.embeddings.create(
                     model=provider.model,
                     input=texts,
                 )
-                return [item.embedding for item in response.data]
+                data = response.data
+
+            out = np.empty((len(data), self.DIMENSION), dtype=np.float32)
+            for i, item in enumerate(data):
+                out[i] = item.embedding
+            return out
         except RateLimitError as e:
             logger.warning(f"Rate limit for {provider.name}: {e}")
             raise
@@ -138,49 +189,189 @@ class MultiProviderEmbeddingService:
             logger.warning(f"Unknown error for {provider.name}: {e}")
             raise
     
-    async def generate_embedding(self, text: str) -> list[float]:
+    async def generate_embedding(self, text: str) -> np.ndarray:
         """
         生成文本的向量嵌入
-        
+
         自动尝试所有配置的 API 提供商。
-        
+
         Args:
             text: 输入文本
-            
+
         Returns:
-            向量数组
+            向量数组 (DIMENSION,) float32
         """
         if not text:
-            return [0.0] * self.DIMENSION
-        
-        results = await self.generate_embeddings([text])
-        return results[0] if results else [0.0] * self.DIMENSION
+            return np.zeros(self.DIMENSION, dtype=np.float32)
+
+        # singleflight: 相同文本的并发请求只触发一次 API 调用
+        key = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await inflight
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._embed_single(text)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
     
-    async def generate_embeddings(self, texts: list[str]) -> list[list[float]]:
+    async def _embed_single(self, text: str) -> np.ndarray:
+        """单文本嵌入入口
+
+        启用合批窗口时，将请求放入微批队列与同窗口到达的其他请求合并为
+        一次批量调用，摊薄提供商 RTT；否则直接单独调用。
+        """
+        if settings.EMBEDDING_BATCH_WINDOW <= 0:
+            results = await self.generate_embeddings([text])
+            if len(results):
+                return results[0]
+            return np.zeros(self.DIMENSION, dtype=np.float32)
+
+        loop = asyncio.get_running_loop()
+        # 队列/任务与事件循环绑定；原循环退出后 (脚本 asyncio.run、
+        # 测试新建循环) 任务不会标记 done，须按循环身份判断重建
+        if (
+            self._batch_task is None
+            or self._batch_task.done()
+            or self._batch_loop is not loop
+        ):
+            self._batch_queue = asyncio.Queue()
+            self._batch_task = loop.create_task(self._batch_worker())
+            self._batch_loop = loop
+
+        future: asyncio.Future = loop.create_future()
+        self._batch_queue.put_nowait((text, future))
+        return await future
+
+    async def _batch_worker(self):
+        """后台微批协程：收集窗口内到达的单文本请求并批量生成"""
+        while True:
+            items = [await self._batch_queue.get()]
+            try:
+                while len(items) < self.MAX_BATCH:
+                    items.append(
+                        await asyncio.wait_for(
+                            self._batch_queue.get(),
+                            timeout=settings.EMBEDDING_BATCH_WINDOW,
+                        )
+                    )
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                vectors = await self.generate_embeddings([t for t, _ in items])
+                for (_, future), vector in zip(items, vectors):
+                    if not future.done():
+                        future.set_result(vector)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _cache_key(self, text: str) -> str:
+        return (
+            self.CACHE_PREFIX
+            + hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+        )
+
+    async def generate_embeddings(self, texts: list[str]) -> np.ndarray:
         """
         批量生成向量嵌入
-        
+
+        先查 Redis 向量缓存（按内容哈希），只有未命中的文本才调用提供商；
+        新向量以原始字节回写缓存。
+
+        Args:
+            texts: 输入文本列表
+
+        Returns:
+            向量矩阵 (N, DIMENSION) float32，按输入顺序逐行填充
+        """
+        if not texts:
+            return np.empty((0, self.DIMENSION), dtype=np.float32)
+
+        from app.services.cache_service import cache_service
+
+        client = cache_service.client
+        out = np.empty((len(texts), self.DIMENSION), dtype=np.float32)
+        miss_indexes = list(range(len(texts)))
+        keys = [self._cache_key(t) for t in texts]
+
+        if client:
+            try:
+                cached = await client.mget(keys)
+                miss_indexes = []
+                for i, raw in enumerate(cached):
+                    if raw is not None:
+                        out[i] = self.bytes_to_vector(raw)
+                    else:
+                        miss_indexes.append(i)
+            except Exception as e:
+                logger.warning(f"Embedding cache lookup failed: {e}")
+                miss_indexes = list(range(len(texts)))
+
+        if miss_indexes:
+            vectors = await self._generate_uncached(
+                [texts[i] for i in miss_indexes]
+            )
+            out[miss_indexes] = vectors
+
+            if client:
+                try:
+                    async with client.pipeline(transaction=False) as pipe:
+                        for i, vector in zip(miss_indexes, vectors):
+                            # 全零向量是失败占位，不缓存
+                            if vector.any():
+                                pipe.setex(
+                                    keys[i],
+                                    self.CACHE_TTL,
+                                    self.vector_to_bytes(vector),
+                                )
+                        await pipe.execute()
+                except Exception as e:
+                    logger.warning(f"Embedding cache write failed: {e}")
+
+        return out
+
+    async def _generate_uncached(self, texts: list[str]) -> np.ndarray:
+        """
+        调用提供商批量生成向量嵌入
+
         自动失败重试：当前一个 API 失败时，自动切换到下一个。
-        
+
         Args:
             texts: 输入文本列表
-            
+
         Returns:
             向量数组列表
         """
-        if not texts:
-            return []
-        
         if not self.providers:
             logger.error("No embedding providers available!")
-            return [[0.0] * self.DIMENSION for _ in texts]
-        
+            return np.zeros((len(texts), self.DIMENSION), dtype=np.float32)
+
+        # 对冲模式：并发请求前两个提供商，最快成功者胜出
+        if settings.EMBEDDING_HEDGE and len(self.providers) >= 2:
+            result = await self._call_hedged(texts)
+            if result is not None:
+                return result
+            logger.warning("Hedged providers failed, falling back to remaining...")
+            remaining = self.providers[2:]
+        else:
+            remaining = self.providers
+
         last_error = None
-        
+
         # 依次尝试每个提供商
-        for i, provider in enumerate(self.providers):
+        for i, provider in enumerate(remaining):
             try:
-                logger.debug(f"Trying provider {provider.name} ({i+1}/{len(self.providers)})")
+                logger.debug(f"Trying provider {provider.name} ({i+1}/{len(remaining)})")
                 
                 # 检查文本数量，决定是否分批
                 if len(texts) == 1:
@@ -204,40 +395,76 @@ class MultiProviderEmbeddingService:
         
         # 所有提供商都失败
         logger.error(f"All {len(self.providers)} providers failed. Last error: {last_error}")
-        return [[0.0] * self.DIMENSION for _ in texts]
+        return np.zeros((len(texts), self.DIMENSION), dtype=np.float32)
     
+    async def _call_hedged(self, texts: list[str]) -> np.ndarray | None:
+        """并发调用前两个提供商，返回最先成功的结果
+
+        失败的任务被忽略，胜出后取消未完成的任务。两个都失败时返回 None。
+        """
+        tasks = {
+            asyncio.create_task(
+                self._call_provider(p, texts, single=len(texts) == 1)
+            ): p
+            for p in self.providers[:2]
+        }
+        pending = set(tasks)
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        logger.info(
+                            f"Hedged embedding won by {tasks[task].name}"
+                        )
+                        return task.result()
+                    logger.warning(
+                        f"Hedged provider {tasks[task].name} failed: "
+                        f"{task.exception()}"
+                    )
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return None
+
     async def generate_embeddings_streaming(
         self,
         texts: list[str],
         batch_size: int = 100,
-    ) -> list[list[float]]:
+    ) -> np.ndarray:
         """
         流式批量生成向量嵌入
-        
-        将大量文本分批处理，避免单次请求过大。
-        
+
+        将大量文本分批处理，避免单次请求过大；各批次在
+        EMBEDDING_CONCURRENCY 限制下并发执行。
+
         Args:
             texts: 输入文本列表
             batch_size: 每批处理的数量 (默认 100)
-            
+
         Returns:
-            向量数组列表
+            向量矩阵 (N, DIMENSION)，按输入顺序
         """
         if not texts:
-            return []
-        
-        all_results = []
-        
-        # 分批处理
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            logger.debug(f"Processing batch {i//batch_size + 1}, size: {len(batch)}")
-            
-            # 处理当前批次
-            batch_results = await self.generate_embeddings(batch)
-            all_results.extend(batch_results)
-        
-        return all_results
+            return np.empty((0, self.DIMENSION), dtype=np.float32)
+
+        # 批次相互独立：有界并发提交，顺序由 gather 保证
+        sem = asyncio.Semaphore(settings.EMBEDDING_CONCURRENCY)
+
+        async def _run(batch: list[str]) -> np.ndarray:
+            async with sem:
+                return await self.generate_embeddings(batch)
+
+        tasks = [
+            asyncio.create_task(_run(texts[i:i + batch_size]))
+            for i in range(0, len(texts), batch_size)
+        ]
+        chunks = await asyncio.gather(*tasks)
+        return np.vstack(chunks)
     
     async def generate_embeddings_async(
         self,
@@ -285,13 +512,39 @@ class MultiProviderEmbeddingService:
         return all_results
     
     def vector_to_bytes(self, vector: list[float]) -> bytes:
-        """将向量转换为字节存储（pgvector 格式）"""
+        """将向量转换为字节存储
+
+        以 float16 存储：空间/带宽减半，余弦相似度精度损失 <1e-4。
+        计算仍在 float32 下进行，仅存储降精度。
+
+        存储前做 L2 归一化，查询端用内积 <#> 即等价于余弦相似度，
+        每行省去两次范数计算。
+        """
         arr = np.array(vector, dtype=np.float32)
-        return arr.tobytes()
-    
+        norm = np.linalg.norm(arr)
+        if norm > 0:
+            arr /= norm
+        return arr.astype(np.float16).tobytes()
+
+    def vector_to_halfvec(self, vector: list[float]) -> str:
+        """转为 pgvector halfvec 文本字面量
+
+        存储前做 L2 归一化，查询端用内积 <#> 即等价于余弦相似度；
+        精度由 halfvec 列在服务端降为 fp16。
+        """
+        arr = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(arr)
+        if norm > 0:
+            arr = arr / norm
+        return "[" + ",".join(map(str, arr.tolist())) + "]"
+
     def bytes_to_vector(self, bytes_data: bytes) -> list[float]:
         """从字节转换为向量"""
-        arr = np.frombuffer(bytes_data, dtype=np.float32)
+        # 兼容未迁移的 float32 旧数据 (每维 4 字节)
+        if len(bytes_data) == self.DIMENSION * 4:
+            arr = np.frombuffer(bytes_data, dtype=np.float32)
+        else:
+            arr = np.frombuffer(bytes_data, dtype=np.float16).astype(np.float32)
         return arr.tolist()
     
     def cosine_similarity(self, vec1: list[float], vec2: list[float]) -> float:
@@ -305,8 +558,32 @@ class MultiProviderEmbeddingService:
         
         if norm1 == 0 or norm2 == 0:
             return 0.0
-        
+
         return float(dot_product / (norm1 * norm2))
+
+    def cosine_similarity_batch(
+        self, query: list[float] | np.ndarray, matrix: np.ndarray
+    ) -> np.ndarray:
+        """批量计算查询向量与 N 个候选向量的余弦相似度
+
+        单次 BLAS 矩阵-向量乘法，比逐对调用 cosine_similarity 快一到两个
+        数量级。零向量的相似度记为 0。
+
+        Args:
+            query: 查询向量 (D,)
+            matrix: 候选向量矩阵 (N, D)
+
+        Returns:
+            相似度数组 (N,)
+        """
+        q = np.asarray(query, dtype=np.float32)
+        q_norm = np.linalg.norm(q)
+        if q_norm == 0:
+            return np.zeros(matrix.shape[0], dtype=np.float32)
+
+        norms = np.linalg.norm(matrix, axis=1)
+        norms[norms == 0] = 1.0  # 避免除零，零向量点积本就是 0
+        return (matrix @ (q / q_norm)) / norms
     
     def get_config(self) -> dict:
         """获取当前配置信息"""
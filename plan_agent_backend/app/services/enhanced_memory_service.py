@@ -3,10 +3,14 @@
 
 整合向量搜索的长期记忆系统。
 """
-import json
+import asyncio
 import logging
+
+import orjson
 from typing import Any
 
+from sqlalchemy import Text, insert, text
+
 from app.dependencies import SessionLocal
 from app.models import UserMemory
 from app.models_memory import MemoryEmbedding
@@ -15,6 +19,47 @@ from app.services.semantic_search_service import semantic_search_service
 
 logger = logging.getLogger(__name__)
 
+# 向量重建后台队列，由应用启动时的 worker 协程消费
+_rebuild_queue: "asyncio.Queue | None" = None
+_rebuild_worker: "asyncio.Task | None" = None
+
+
+async def start_memory_worker():
+    """启动向量重建后台 worker (应用启动时调用)"""
+    global _rebuild_queue, _rebuild_worker
+
+    if _rebuild_worker is not None and not _rebuild_worker.done():
+        return
+
+    _rebuild_queue = asyncio.Queue()
+    _rebuild_worker = asyncio.create_task(_drain_rebuild_queue())
+
+
+async def stop_memory_worker():
+    """停止向量重建后台 worker (应用关闭时调用)"""
+    global _rebuild_queue, _rebuild_worker
+
+    if _rebuild_worker is not None:
+        _rebuild_worker.cancel()
+        try:
+            await _rebuild_worker
+        except asyncio.CancelledError:
+            pass
+    _rebuild_worker = None
+    _rebuild_queue = None
+
+
+async def _drain_rebuild_queue():
+    """循环消费重建任务"""
+    while True:
+        memory_ids, user_id, memory_type = await _rebuild_queue.get()
+        try:
+            await enhanced_long_term_memory._rebuild_embeddings_async(
+                memory_ids, user_id, memory_type
+            )
+        except Exception as e:
+            logger.error(f"Embedding rebuild failed: {e}")
+
 
 class EnhancedLongTermMemory:
     """
@@ -51,7 +96,7 @@ class EnhancedLongTermMemory:
         # 将 content 转为 JSONB 兼容格式
         if isinstance(content, dict):
             content_json = content
-            content_text = json.dumps(content, ensure_ascii=False)
+            content_text = orjson.dumps(content).decode()
         else:
             content_json = {"text": content}
             content_text = content
@@ -86,18 +131,20 @@ class EnhancedLongTermMemory:
         try:
             # 生成向量
             vector = await self.embedding_service.generate_embedding(content)
-            vector_bytes = self.embedding_service.vector_to_bytes(vector)
+            vector_literal = self.embedding_service.vector_to_halfvec(vector)
             
             with SessionLocal() as db:
                 embedding = MemoryEmbedding(
                     memory_id=memory_id,
                     user_id=user_id,
                     memory_type=memory_type,
-                    embedding=vector_bytes,
+                    embedding=vector_literal,
                 )
                 db.add(embedding)
                 db.commit()
-                return True
+            # 新向量落库后让该用户的搜索结果缓存失效
+            self.semantic_service.invalidate_user(user_id)
+            return True
         except Exception as e:
             logger.error(f"Failed to create embedding for memory {memory_id}: {e}")
             return False
@@ -117,34 +164,25 @@ class EnhancedLongTermMemory:
         Returns:
             memory_id 列表
         """
-        memory_ids = []
-        
-        # 批量创建记忆
+        rows = [
+            {
+                "user_id": mem["user_id"],
+                "memory_type": mem["memory_type"],
+                "content": mem["content"]
+                if isinstance(mem["content"], dict)
+                else {"text": mem["content"]},
+                "context": mem.get("context"),
+            }
+            for mem in memories
+        ]
+
+        # 单条 INSERT .. RETURNING 拿回全部 ID，免去逐行 refresh
         with SessionLocal() as db:
-            for mem in memories:
-                if isinstance(mem["content"], dict):
-                    content_json = mem["content"]
-                    content_text = json.dumps(mem["content"], ensure_ascii=False)
-                else:
-                    content_json = {"text": mem["content"]}
-                    content_text = mem["content"]
-                
-                memory = UserMemory(
-                    user_id=mem["user_id"],
-                    memory_type=mem["memory_type"],
-                    content=content_json,
-                    context=mem.get("context"),
-                )
-                db.add(memory)
-                memory_ids.append(memory)
-            
+            result = db.execute(
+                insert(UserMemory).values(rows).returning(UserMemory.id)
+            )
+            memory_ids = [row[0] for row in result]
             db.commit()
-            
-            # 刷新获取 ID
-            for mem_obj in memory_ids:
-                db.refresh(mem_obj)
-            
-            memory_ids = [m.id for m in memory_ids]
         
         # 批量生成向量
         if generate_embeddings:
@@ -163,26 +201,28 @@ class EnhancedLongTermMemory:
             texts = []
             for mem in memories:
                 if isinstance(mem["content"], dict):
-                    texts.append(json.dumps(mem["content"], ensure_ascii=False))
+                    texts.append(orjson.dumps(mem["content"]).decode())
                 else:
                     texts.append(mem["content"])
             
             vectors = await self.embedding_service.generate_embeddings(texts)
-            
-            # 批量存储
+
+            # 批量存储 (单条预编译语句，避免逐行 flush)
+            rows = [
+                {
+                    "memory_id": memory_id,
+                    "user_id": mem["user_id"],
+                    "memory_type": mem["memory_type"],
+                    "embedding": self.embedding_service.vector_to_halfvec(vector),
+                }
+                for memory_id, vector, mem in zip(memory_ids, vectors, memories)
+            ]
             with SessionLocal() as db:
-                for memory_id, vector, mem in zip(memory_ids, vectors, memories):
-                    vector_bytes = self.embedding_service.vector_to_bytes(vector)
-                    embedding = MemoryEmbedding(
-                        memory_id=memory_id,
-                        user_id=mem["user_id"],
-                        memory_type=mem["memory_type"],
-                        embedding=vector_bytes,
-                    )
-                    db.add(embedding)
-                
+                db.bulk_insert_mappings(MemoryEmbedding, rows)
                 db.commit()
-            
+
+            for uid in {row["user_id"] for row in rows}:
+                self.semantic_service.invalidate_user(uid)
             return True
         except Exception as e:
             logger.error(f"Failed to create batch embeddings: {e}")
@@ -253,11 +293,11 @@ class EnhancedLongTermMemory:
         try:
             # 生成查询向量
             vector = await self.embedding_service.generate_embedding(query)
-            vector_bytes = self.embedding_service.vector_to_bytes(vector)
+            vector_literal = self.embedding_service.vector_to_halfvec(vector)
             
             # 向量相似度搜索
             results = self.semantic_service.search_similar(
-                query_embedding=vector_bytes,
+                query_embedding=vector_literal,
                 user_id=user_id,
                 memory_type=memory_type,
                 limit=limit,
@@ -279,9 +319,12 @@ class EnhancedLongTermMemory:
     ) -> list[dict]:
         """关键词搜索"""
         with SessionLocal() as db:
+            # content::text 上有 pg_trgm GIN 索引 (trgm_migration)；
+            # 表达式索引要求查询表达式完全一致，必须 cast 成 Text
+            # (CAST AS VARCHAR 不匹配索引)，>=3 字符的 ILIKE 才走索引
             query = db.query(UserMemory).filter(
                 UserMemory.user_id == user_id,
-                UserMemory.content.cast(str).ilike(f"%{keyword}%")
+                UserMemory.content.cast(Text).ilike(f"%{keyword}%")
             )
             
             if memory_type:
@@ -302,35 +345,41 @@ class EnhancedLongTermMemory:
             ]
     
     def get_user_profile(self, user_id: int) -> dict:
-        """获取用户画像"""
-        memories = self.get_recent_memories(user_id, limit=50)
-        
-        # 聚合偏好
+        """获取用户画像
+
+        最近 50 条记忆的按类型聚合在 SQL 端完成，单次往返返回
+        每类的内容数组，避免逐行 ORM 加载。
+        """
+        sql = text("""
+            SELECT memory_type, jsonb_agg(content ORDER BY created_at DESC), count(*)
+            FROM (
+                SELECT memory_type, content, created_at
+                FROM user_memories
+                WHERE user_id = :user_id
+                ORDER BY created_at DESC
+                LIMIT 50
+            ) recent
+            GROUP BY memory_type
+        """)
+
+        with SessionLocal() as db:
+            rows = db.execute(sql, {"user_id": user_id}).fetchall()
+
+        by_type = {row[0]: row[1] for row in rows}
+        total = sum(row[2] for row in rows)
+
         preferences = {}
-        goals = []
-        reflections = []
-        
-        for memory in memories:
-            mem_type = memory["type"]
-            content = memory["content"]
-            
-            if mem_type == "preference":
-                if isinstance(content, dict):
-                    preferences.update(content)
-                else:
-                    preferences[content] = True
-            
-            elif mem_type == "goal":
-                goals.append(content)
-            
-            elif mem_type == "reflection":
-                reflections.append(content)
-        
+        for content in by_type.get("preference", []):
+            if isinstance(content, dict):
+                preferences.update(content)
+            else:
+                preferences[content] = True
+
         return {
             "preferences": preferences,
-            "recent_goals": goals[:5],
-            "recent_reflections": reflections[:5],
-            "total_memories": len(memories),
+            "recent_goals": by_type.get("goal", [])[:5],
+            "recent_reflections": by_type.get("reflection", [])[:5],
+            "total_memories": total,
         }
     
     def rebuild_embeddings(
@@ -354,15 +403,22 @@ class EnhancedLongTermMemory:
                 query = query.filter(UserMemory.user_id == user_id)
             if memory_type:
                 query = query.filter(UserMemory.memory_type == memory_type)
-            
+
             memories = query.all()
-        
-        import asyncio
-        # 同步调用批量生成（实际使用时建议用 celery 等异步处理）
-        asyncio.create_task(
-            self._rebuild_embeddings_async([m.id for m in memories], user_id, memory_type)
+
+        # 入队由启动时的 worker 协程消费；本方法是同步的，
+        # 不能直接 create_task (没有运行中的事件循环时会抛异常且任务丢失)
+        if _rebuild_queue is None:
+            logger.warning("Memory rebuild worker not running, skipping rebuild")
+            return {
+                "total_missing": len(memories),
+                "status": "worker not running",
+            }
+
+        _rebuild_queue.put_nowait(
+            ([m.id for m in memories], user_id, memory_type)
         )
-        
+
         return {
             "total_missing": len(memories),
             "status": "rebuilding in background",
@@ -375,36 +431,37 @@ class EnhancedLongTermMemory:
         memory_type: str | None,
     ):
         """异步重建向量"""
-        # 获取记忆内容
+        # content_text 是数据库生成列，免去逐行 Python 序列化
         with SessionLocal() as db:
-            memories = db.query(UserMemory).filter(
-                UserMemory.id.in_(memory_ids)
-            ).all()
-        
-        texts = []
-        for m in memories:
-            if isinstance(m.content, dict):
-                texts.append(json.dumps(m.content, ensure_ascii=False))
-            else:
-                texts.append(str(m.content))
-        
+            memories = db.query(
+                UserMemory.id,
+                UserMemory.user_id,
+                UserMemory.memory_type,
+                UserMemory.content_text,
+            ).filter(UserMemory.id.in_(memory_ids)).all()
+
+        texts = [m.content_text or "" for m in memories]
+
         # 批量生成
         vectors = await self.embedding_service.generate_embeddings(texts)
-        
-        # 批量存储
+
+        # 批量存储 (单条预编译语句，避免逐行 flush)
+        rows = [
+            {
+                "memory_id": memory.id,
+                "user_id": memory.user_id,
+                "memory_type": memory.memory_type,
+                "embedding": self.embedding_service.vector_to_halfvec(vector),
+            }
+            for memory, vector in zip(memories, vectors)
+        ]
         with SessionLocal() as db:
-            for memory, vector in zip(memories, vectors):
-                vector_bytes = self.embedding_service.vector_to_bytes(vector)
-                embedding = MemoryEmbedding(
-                    memory_id=memory.id,
-                    user_id=memory.user_id,
-                    memory_type=memory.memory_type,
-                    embedding=vector_bytes,
-                )
-                db.add(embedding)
-            
+            db.bulk_insert_mappings(MemoryEmbedding, rows)
             db.commit()
-        
+
+        for uid in {row["user_id"] for row in rows}:
+            self.semantic_service.invalidate_user(uid)
+
         logger.info(f"Rebuilt {len(memory_ids)} embeddings")
 
 
@@ -1,7 +1,7 @@
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from typing import Optional
 
-from sqlalchemy import func
+from sqlalchemy import case, func
 
 from app.dependencies import SessionLocal
 from app.models import Task, ExecutionLog
@@ -16,23 +16,21 @@ class ExecutionService:
         feedback: str | None = None,
     ) -> ExecutionLog:
         with SessionLocal() as db:
-            tasks_completed = (
-                db.query(func.count(Task.id))
-                .filter(
-                    Task.user_id == user_id,
-                    Task.status == "completed",
-                    func.date(Task.due_date) == log_date,
+            # 条件聚合：一次扫描同时得到总数和已完成数
+            tasks_total, tasks_completed = (
+                db.query(
+                    func.count(Task.id),
+                    func.coalesce(
+                        func.sum(case((Task.status == "completed", 1), else_=0)), 0
+                    ),
                 )
-                .scalar() or 0
-            )
-
-            tasks_total = (
-                db.query(func.count(Task.id))
                 .filter(
+                    # due_date 本身是 DATE 列；包一层 func.date() 会让
+                    # 规划器放弃 (user_id, due_date) 索引
                     Task.user_id == user_id,
-                    func.date(Task.due_date) == log_date,
+                    Task.due_date == log_date,
                 )
-                .scalar() or 0
+                .one()
             )
 
             existing_log = (
@@ -136,16 +134,24 @@ class ExecutionService:
         end_date: date | None = None,
     ) -> dict:
         with SessionLocal() as db:
-            query = db.query(ExecutionLog).filter(ExecutionLog.user_id == user_id)
-
+            filters = [ExecutionLog.user_id == user_id]
             if start_date:
-                query = query.filter(ExecutionLog.log_date >= start_date)
+                filters.append(ExecutionLog.log_date >= start_date)
             if end_date:
-                query = query.filter(ExecutionLog.log_date <= end_date)
-
-            logs = query.all()
+                filters.append(ExecutionLog.log_date <= end_date)
+
+            # 汇总在 SQL 端完成，不把整年的行搬进 Python
+            total_days, total_tasks, total_completed = (
+                db.query(
+                    func.count(ExecutionLog.id),
+                    func.coalesce(func.sum(ExecutionLog.tasks_total), 0),
+                    func.coalesce(func.sum(ExecutionLog.tasks_completed), 0),
+                )
+                .filter(*filters)
+                .one()
+            )
 
-            if not logs:
+            if not total_days:
                 return {
                     "total_days": 0,
                     "total_tasks": 0,
@@ -154,22 +160,36 @@ class ExecutionService:
                     "streak_days": 0,
                 }
 
-            total_tasks = sum(log.tasks_total for log in logs)
-            total_completed = sum(log.tasks_completed for log in logs)
             average_rate = (total_completed / total_tasks * 100) if total_tasks > 0 else 0
 
-            streak = 0
+            # 只取有完成记录的日期，倒序走到第一个断档即停：O(streak) 而非 O(365)
             today = date.today()
-            for i in range(365):
-                check_date = today - __import__('datetime').timedelta(days=i)
-                log = next((l for l in logs if l.log_date == check_date), None)
-                if log and log.tasks_completed > 0:
+            streak_dates = (
+                db.query(ExecutionLog.log_date)
+                .filter(
+                    *filters,
+                    ExecutionLog.tasks_completed > 0,
+                    ExecutionLog.log_date <= today,
+                    ExecutionLog.log_date > today - timedelta(days=365),
+                )
+                .order_by(ExecutionLog.log_date.desc())
+                .all()
+            )
+
+            streak = 0
+            # 今天还没打卡不算断档，从昨天接着数
+            expected = today
+            for (log_date,) in streak_dates:
+                if log_date == expected or (
+                    streak == 0 and log_date == today - timedelta(days=1)
+                ):
                     streak += 1
-                elif i > 0:
+                    expected = log_date - timedelta(days=1)
+                else:
                     break
 
             return {
-                "total_days": len(logs),
+                "total_days": total_days,
                 "total_tasks": total_tasks,
                 "total_completed": total_completed,
                 "average_completion_rate": round(average_rate, 2),
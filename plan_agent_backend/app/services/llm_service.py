@@ -7,6 +7,7 @@ import json
 import logging
 from typing import Any, Optional
 
+import httpx
 from openai import AsyncOpenAI
 
 from app.config import settings
@@ -22,6 +23,7 @@ class LLMService:
     """
     _instance: Optional["LLMService"] = None
     _client: Optional[AsyncOpenAI] = None
+    _http: Optional[httpx.AsyncClient] = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -30,13 +32,28 @@ class LLMService:
 
     def __init__(self):
         if self._client is None:
+            # 自建 httpx 客户端：放宽连接池上限并保持长连接，
+            # 并发调用（晚间复盘、反思）复用 TCP/TLS 而不是各自握手
+            self._http = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=128,
+                    max_keepalive_connections=64,
+                ),
+                timeout=httpx.Timeout(60.0),
+            )
             self._client = AsyncOpenAI(
                 api_key=settings.LLM_API_KEY,
                 base_url=settings.LLM_API_BASE_URL,
+                http_client=self._http,
             )
             self._model = settings.LLM_MODEL_NAME
             logger.info(f"LLMService initialized with model: {self._model}")
 
+    async def aclose(self):
+        """关闭底层 HTTP 连接池（应用关闭时调用）"""
+        if self._http is not None:
+            await self._http.aclose()
+
     @property
     def client(self) -> AsyncOpenAI:
         return self._client
@@ -82,22 +99,39 @@ class LLMService:
         self,
         messages: list[dict],
         temperature: float = 0.7,
+        json_schema: dict | None = None,
+        schema_name: str = "response",
     ) -> dict:
         """
         发送聊天请求，要求返回 JSON
-        
+
         Args:
             messages: 消息列表
             temperature: 温度参数
-            
+            json_schema: 可选的 JSON Schema；提供时走结构化输出
+                (strict 模式)，省去在提示词里内嵌格式示例
+            schema_name: 结构化输出的 schema 名称
+
         Returns:
             解析后的 JSON 响应
         """
+        if json_schema is not None:
+            response_format = {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": schema_name,
+                    "strict": True,
+                    "schema": json_schema,
+                },
+            }
+        else:
+            response_format = {"type": "json_object"}
+
         response = await self._client.chat.completions.create(
             model=self._model,
             messages=messages,
             temperature=temperature,
-            response_format={"type": "json_object"},
+            response_format=response_format,
         )
         content = response.choices[0].message.content
         return json.loads(content)
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from datetime import datetime, date, timedelta
 from typing import Any
@@ -7,46 +8,89 @@ from app.services.llm_service import llm_service
 from app.dependencies import SessionLocal
 from app.models import User, Task, ExecutionLog
 from app.agent.tools.send_notification_tool import SendNotificationTool
+from app.utils.timezone import format_hhmm
+
+
+# 静态提示词骨架只构建一次，每次调用仅做插值
+_REVIEW_PROMPT_TEMPLATE = """
+Based on the following daily task summary, generate a personalized evening review message for the user.
+Be encouraging and provide helpful suggestions. Keep the message concise (under 200 characters).
+
+## Daily Summary:
+- Total tasks: {total}
+- Completed: {completed}
+- Pending: {pending}
+- Completion rate: {rate:.1f}%
+- Completed tasks: {completed_titles}
+- Pending tasks: {pending_titles}
+- Difficulties: {difficulties}
+- Feedback: {feedback}
+
+Generate a short, personalized message in Chinese that:
+1. Acknowledges their progress
+2. Provides encouragement
+3. Gives a brief suggestion for tomorrow
+
+Output only the message text, no JSON or formatting.
+"""
+
+# 标题列表截断上限，防止任务很多时提示词无界增长
+_REVIEW_MAX_TITLES = 10
+
+
+def _join_titles(titles: list[str]) -> str:
+    if not titles:
+        return "None"
+    shown = ", ".join(titles[:_REVIEW_MAX_TITLES])
+    if len(titles) > _REVIEW_MAX_TITLES:
+        shown += f", ... (+{len(titles) - _REVIEW_MAX_TITLES} more)"
+    return shown
 
 
 class PushService:
+    # 批量推送的最大并发数
+    MAX_CONCURRENCY = 10
+
     def __init__(self):
         self.llm_service = llm_service
         self.notification_tool = SendNotificationTool()
 
-    async def get_upcoming_tasks(self, minutes: int = 30) -> list[dict]:
-        now = datetime.now()
+    async def get_upcoming_tasks(
+        self, minutes: int = 30, now: datetime | None = None
+    ) -> list[dict]:
+        # 时钟只在调度入口读一次，向下透传；也便于测试注入固定时间
+        if now is None:
+            now = datetime.now()
         end_time = now + timedelta(minutes=minutes)
 
         with SessionLocal() as db:
-            today = date.today()
-            current_time = now.strftime("%H:%M")
+            today = now.date()
 
-            tasks = (
-                db.query(Task)
+            # JOIN 一次取回任务和用户，避免逐任务查 User 的 N+1；
+            # due_time 是原生 TIME，范围谓词可走 (status, due_date, due_time) 索引
+            rows = (
+                db.query(Task, User)
+                .join(User, User.id == Task.user_id)
                 .filter(
                     Task.status == "pending",
                     Task.due_date == today,
-                    Task.due_time >= current_time,
-                    Task.due_time <= end_time.strftime("%H:%M"),
+                    Task.due_time.between(now.time(), end_time.time()),
+                    User.push_token.isnot(None),
                 )
                 .all()
             )
 
-            result = []
-            for task in tasks:
-                user = db.query(User).filter(User.id == task.user_id).first()
-                if user and user.push_token:
-                    result.append({
-                        "task_id": task.id,
-                        "user_id": task.user_id,
-                        "username": user.username,
-                        "push_token": user.push_token,
-                        "title": task.title,
-                        "due_time": task.due_time,
-                    })
-
-            return result
+            return [
+                {
+                    "task_id": task.id,
+                    "user_id": task.user_id,
+                    "username": user.username,
+                    "push_token": user.push_token,
+                    "title": task.title,
+                    "due_time": format_hhmm(task.due_time),
+                }
+                for task, user in rows
+            ]
 
     async def send_task_reminder(self, task_info: dict) -> dict:
         try:
@@ -78,12 +122,34 @@ class PushService:
             }
 
     async def send_task_reminders(self) -> dict:
-        tasks = await self.get_upcoming_tasks(minutes=30)
+        now = datetime.now()
+        tasks = await self.get_upcoming_tasks(minutes=30, now=now)
+
+        # 批量单推：N 条提醒合并为一次提供商往返，而不是 N 次 HTTP POST
+        messages = [
+            {
+                "push_token": task_info["push_token"],
+                "title": "任务提醒",
+                "content": f"您的任务「{task_info['title']}」将在{task_info['due_time']}开始，请做好准备！",
+                "extras": {
+                    "type": "task_reminder",
+                    "task_id": task_info["task_id"],
+                },
+            }
+            for task_info in tasks
+        ]
 
-        results = []
-        for task_info in tasks:
-            result = await self.send_task_reminder(task_info)
-            results.append(result)
+        bulk_results = await self.notification_tool.execute_bulk(messages)
+
+        results = [
+            {
+                "success": r.success,
+                "task_id": task_info["task_id"],
+                "user_id": task_info["user_id"],
+                "error": r.error if not r.success else None,
+            }
+            for task_info, r in zip(tasks, bulk_results)
+        ]
 
         success_count = sum(1 for r in results if r["success"])
 
@@ -94,12 +160,16 @@ class PushService:
             "details": results,
         }
 
-    async def get_user_daily_summary(self, user_id: int) -> dict:
-        today = date.today()
+    async def get_user_daily_summary(
+        self, user_id: int, today: date | None = None
+    ) -> dict:
+        if today is None:
+            today = date.today()
 
         with SessionLocal() as db:
+            # 只取需要的列，单遍分桶代替三次列表推导
             tasks = (
-                db.query(Task)
+                db.query(Task.status, Task.title)
                 .filter(
                     Task.user_id == user_id,
                     Task.due_date == today,
@@ -107,12 +177,21 @@ class PushService:
                 .all()
             )
 
-            completed = [t for t in tasks if t.status == "completed"]
-            pending = [t for t in tasks if t.status == "pending"]
-            skipped = [t for t in tasks if t.status == "skipped"]
+            completed: list[str] = []
+            pending: list[str] = []
+            skipped: list[str] = []
+            buckets = {
+                "completed": completed,
+                "pending": pending,
+                "skipped": skipped,
+            }
+            for status, title in tasks:
+                bucket = buckets.get(status)
+                if bucket is not None:
+                    bucket.append(title)
 
             execution_log = (
-                db.query(ExecutionLog)
+                db.query(ExecutionLog.difficulties, ExecutionLog.feedback)
                 .filter(
                     ExecutionLog.user_id == user_id,
                     ExecutionLog.log_date == today,
@@ -126,38 +205,26 @@ class PushService:
                 "pending_count": len(pending),
                 "skipped_count": len(skipped),
                 "completion_rate": (len(completed) / len(tasks) * 100) if tasks else 0,
-                "completed_titles": [t.title for t in completed],
-                "pending_titles": [t.title for t in pending],
+                "completed_titles": completed,
+                "pending_titles": pending,
                 "difficulties": execution_log.difficulties if execution_log else None,
                 "feedback": execution_log.feedback if execution_log else None,
             }
 
     async def generate_review_message(self, user_id: int, summary: dict) -> str:
-        prompt = f"""
-Based on the following daily task summary, generate a personalized evening review message for the user.
-Be encouraging and provide helpful suggestions. Keep the message concise (under 200 characters).
-
-## Daily Summary:
-- Total tasks: {summary['total_tasks']}
-- Completed: {summary['completed_count']}
-- Pending: {summary['pending_count']}
-- Completion rate: {summary['completion_rate']:.1f}%
-- Completed tasks: {', '.join(summary['completed_titles']) if summary['completed_titles'] else 'None'}
-- Pending tasks: {', '.join(summary['pending_titles']) if summary['pending_titles'] else 'None'}
-- Difficulties: {summary.get('difficulties', 'None')}
-- Feedback: {summary.get('feedback', 'None')}
-
-Generate a short, personalized message in Chinese that:
-1. Acknowledges their progress
-2. Provides encouragement
-3. Gives a brief suggestion for tomorrow
-
-Output only the message text, no JSON or formatting.
-"""
+        prompt = _REVIEW_PROMPT_TEMPLATE.format(
+            total=summary["total_tasks"],
+            completed=summary["completed_count"],
+            pending=summary["pending_count"],
+            rate=summary["completion_rate"],
+            completed_titles=_join_titles(summary["completed_titles"]),
+            pending_titles=_join_titles(summary["pending_titles"]),
+            difficulties=summary.get("difficulties") or "None",
+            feedback=summary.get("feedback") or "None",
+        )
 
         try:
-            response = await self.llm_client.chat.completions.create(
-                model=settings.LLM_MODEL_NAME,
+            response = await self.llm_service.chat_raw(
                 messages=[
                     {
                         "role": "system",
@@ -176,7 +243,9 @@ Output only the message text, no JSON or formatting.
             else:
                 return "今天辛苦了！明天继续加油，相信你可以做得更好！"
 
-    async def send_evening_review_for_user(self, user: User) -> dict:
+    async def send_evening_review_for_user(
+        self, user: User, today: date | None = None
+    ) -> dict:
         if not user.push_token:
             return {
                 "success": False,
@@ -185,7 +254,7 @@ Output only the message text, no JSON or formatting.
             }
 
         try:
-            summary = await self.get_user_daily_summary(user.id)
+            summary = await self.get_user_daily_summary(user.id, today=today)
 
             if summary["total_tasks"] == 0:
                 return {
@@ -223,13 +292,38 @@ Output only the message text, no JSON or formatting.
             }
 
     async def send_evening_review(self) -> dict:
+        today = date.today()
+
         with SessionLocal() as db:
-            users = db.query(User).filter(User.push_token.isnot(None)).all()
+            # EXISTS 预过滤：今天没有任务的用户在 DB 端就被剔除，
+            # 不再为他们各开一次会话后才发现 total_tasks == 0
+            has_task_today = (
+                db.query(Task.id)
+                .filter(Task.user_id == User.id, Task.due_date == today)
+                .exists()
+            )
+            users = (
+                db.query(User)
+                .filter(User.push_token.isnot(None), has_task_today)
+                .all()
+            )
 
-        results = []
-        for user in users:
-            result = await self.send_evening_review_for_user(user)
-            results.append(result)
+        # 每个用户都要等 DB + LLM 往返，受限并发把串行等待摊平
+        sem = asyncio.Semaphore(self.MAX_CONCURRENCY)
+
+        async def _one(user: User) -> dict:
+            async with sem:
+                return await self.send_evening_review_for_user(user, today=today)
+
+        raw_results = await asyncio.gather(
+            *(_one(u) for u in users), return_exceptions=True
+        )
+        results = [
+            r
+            if not isinstance(r, BaseException)
+            else {"success": False, "user_id": u.id, "error": str(r)}
+            for u, r in zip(users, raw_results)
+        ]
 
         success_count = sum(1 for r in results if r["success"])
 
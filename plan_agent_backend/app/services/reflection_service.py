@@ -1,18 +1,94 @@
+import asyncio
 import json
+
+import orjson
 from datetime import date, timedelta
 
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import bindparam, case, update
+
 from app.dependencies import SessionLocal
 from app.models import User, Goal, Task, ExecutionLog, ReflectionLog
 from app.agent.skills.adjust_tasks_skill import AdjustTasksSkill
 from app.services.llm_service import llm_service
-from app.utils.timezone import get_utc_now
+from app.utils.timezone import format_hhmm, get_utc_now
+
+
+# 静态提示词骨架只构建一次；每次调用仅做三处插值。
+# JSON 序列化走 orjson 且不缩进——LLM 不需要缩进，紧凑输出还省 token。
+# 输出格式不再内嵌 40 行示例，由结构化输出 schema 约束。
+REFLECTION_PROMPT_TEMPLATE = """
+You are an expert learning plan reflection assistant. Analyze the following data and provide structured recommendations.
+
+## Recent Execution Logs (Last 7 Days):
+{execution_logs}
+
+## Current Tasks:
+{tasks}
+
+## Goal Outline:
+{goal_outline}
+
+Analyze the data and fill in the structured response: actionable task
+adjustments (reschedule/change_priority/mark_completed/mark_skipped),
+optional new tasks, general suggestions, and a brief summary.
+"""
+
+
+class ReflectionAnalysis(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    overall_progress: str
+    completion_trend: str
+    key_issues: list[str]
+    positive_aspects: list[str]
+
+
+class TaskAdjustment(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    task_id: int
+    action: str
+    new_due_date: str | None
+    new_priority: int | None
+    reason: str
+
+
+class NewTask(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    title: str
+    description: str
+    due_date: str
+    priority: int
+    reason: str
+
+
+class ReflectionRecommendations(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    task_adjustments: list[TaskAdjustment]
+    new_tasks: list[NewTask]
+    general_suggestions: list[str]
+
+
+class ReflectionResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    analysis: ReflectionAnalysis
+    recommendations: ReflectionRecommendations
+    reflection_summary: str
+
+
+# schema 只生成一次，strict 模式保证语法合法的 JSON，无需重试解析
+REFLECTION_RESPONSE_SCHEMA = ReflectionResponse.model_json_schema()
 
 
 class ReflectionService:
     def __init__(self):
         self.adjust_skill = AdjustTasksSkill()
 
-    async def get_execution_logs_for_reflection(
+    def get_execution_logs_for_reflection(
         self,
         user_id: int,
         days: int = 7,
@@ -20,36 +96,61 @@ class ReflectionService:
     ) -> list[dict]:
         with SessionLocal() as db:
             start_date = date.today() - timedelta(days=days)
-            query = db.query(ExecutionLog).filter(
-                ExecutionLog.user_id == user_id,
-                ExecutionLog.log_date >= start_date,
+            # 只选需要的列，跳过完整 ORM 对象的水合开销；
+            # completion_rate 由 SQL 端条件表达式直接算好
+            rows = (
+                db.query(
+                    ExecutionLog.log_date,
+                    ExecutionLog.tasks_completed,
+                    ExecutionLog.tasks_total,
+                    case(
+                        (
+                            ExecutionLog.tasks_total > 0,
+                            ExecutionLog.tasks_completed
+                            * 100.0
+                            / ExecutionLog.tasks_total,
+                        ),
+                        else_=0,
+                    ).label("completion_rate"),
+                    ExecutionLog.difficulties,
+                    ExecutionLog.feedback,
+                )
+                .filter(
+                    ExecutionLog.user_id == user_id,
+                    ExecutionLog.log_date >= start_date,
+                )
+                .order_by(ExecutionLog.log_date.desc())
+                .all()
             )
 
-            logs = query.order_by(ExecutionLog.log_date.desc()).all()
-
             return [
                 {
-                    "log_date": l.log_date.isoformat(),
-                    "tasks_completed": l.tasks_completed,
-                    "tasks_total": l.tasks_total,
-                    "completion_rate": (
-                        l.tasks_completed / l.tasks_total * 100
-                        if l.tasks_total > 0
-                        else 0
-                    ),
-                    "difficulties": l.difficulties,
-                    "feedback": l.feedback,
+                    "log_date": row.log_date.isoformat(),
+                    "tasks_completed": row.tasks_completed,
+                    "tasks_total": row.tasks_total,
+                    "completion_rate": row.completion_rate,
+                    "difficulties": row.difficulties,
+                    "feedback": row.feedback,
                 }
-                for l in logs
+                for row in rows
             ]
 
-    async def get_tasks_for_reflection(
+    def get_tasks_for_reflection(
         self,
         user_id: int,
         goal_id: int | None = None,
     ) -> list[dict]:
         with SessionLocal() as db:
-            query = db.query(Task).filter(Task.user_id == user_id)
+            query = db.query(
+                Task.id,
+                Task.title,
+                Task.description,
+                Task.due_date,
+                Task.due_time,
+                Task.status,
+                Task.priority,
+                Task.goal_id,
+            ).filter(Task.user_id == user_id)
 
             if goal_id:
                 query = query.filter(Task.goal_id == goal_id)
@@ -62,7 +163,7 @@ class ReflectionService:
                     "title": t.title,
                     "description": t.description,
                     "due_date": t.due_date.isoformat(),
-                    "due_time": t.due_time,
+                    "due_time": format_hhmm(t.due_time),
                     "status": t.status,
                     "priority": t.priority,
                     "goal_id": t.goal_id,
@@ -70,7 +171,7 @@ class ReflectionService:
                 for t in tasks
             ]
 
-    async def get_goal_outline(self, goal_id: int) -> dict | None:
+    def get_goal_outline(self, goal_id: int) -> dict | None:
         with SessionLocal() as db:
             goal = db.query(Goal).filter(Goal.id == goal_id).first()
             if goal:
@@ -90,50 +191,15 @@ class ReflectionService:
         tasks: list[dict],
         goal_outline: dict | None = None,
     ) -> dict:
-        prompt = f"""
-You are an expert learning plan reflection assistant. Analyze the following data and provide structured recommendations.
-
-## Recent Execution Logs (Last 7 Days):
-{json.dumps(execution_logs, ensure_ascii=False, indent=2)}
-
-## Current Tasks:
-{json.dumps(tasks, ensure_ascii=False, indent=2)}
-
-## Goal Outline:
-{json.dumps(goal_outline, ensure_ascii=False, indent=2) if goal_outline else "No specific goal context"}
-
-Please analyze the data and provide recommendations in the following JSON format:
-{{
-    "analysis": {{
-        "overall_progress": "<brief analysis of overall progress>",
-        "completion_trend": "<analysis of completion trend>",
-        "key_issues": ["<issue1>", "<issue2>"],
-        "positive_aspects": ["<aspect1>", "<aspect2>"]
-    }},
-    "recommendations": {{
-        "task_adjustments": [
-            {{
-                "task_id": <id>,
-                "action": "<reschedule|change_priority|mark_completed|mark_skipped>",
-                "new_due_date": "<YYYY-MM-DD or null>",
-                "new_priority": <0/1/2 or null>,
-                "reason": "<why this adjustment>"
-            }}
-        ],
-        "new_tasks": [
-            {{
-                "title": "<task title>",
-                "description": "<description>",
-                "due_date": "<YYYY-MM-DD>",
-                "priority": <0/1/2>,
-                "reason": "<why add this task>"
-            }}
-        ],
-        "general_suggestions": ["<suggestion1>", "<suggestion2>"]
-    }},
-    "reflection_summary": "<brief summary of the reflection>"
-}}
-"""
+        prompt = REFLECTION_PROMPT_TEMPLATE.format(
+            execution_logs=orjson.dumps(execution_logs).decode(),
+            tasks=orjson.dumps(tasks).decode(),
+            goal_outline=(
+                orjson.dumps(goal_outline).decode()
+                if goal_outline
+                else "No specific goal context"
+            ),
+        )
 
         try:
             result = await llm_service.chat_with_json(
@@ -145,6 +211,8 @@ Please analyze the data and provide recommendations in the following JSON format
                     {"role": "user", "content": prompt},
                 ],
                 temperature=0.7,
+                json_schema=REFLECTION_RESPONSE_SCHEMA,
+                schema_name="reflection_response",
             )
             return result
         except Exception as e:
@@ -199,55 +267,98 @@ Please analyze the data and provide recommendations in the following JSON format
         created_count = 0
 
         with SessionLocal() as db:
+            # 一次取回本用户待调整的任务 ID，再批量 UPDATE/INSERT，
+            # 代替每条建议一次 SELECT + 一次 flush
+            ids = [
+                adj["task_id"]
+                for adj in adjustments
+                if adj.get("task_id") and adj.get("action")
+            ]
+            valid_ids = (
+                {
+                    task_id
+                    for (task_id,) in db.query(Task.id).filter(
+                        Task.id.in_(ids), Task.user_id == user_id
+                    )
+                }
+                if ids
+                else set()
+            )
+
+            # 按动作分组成 executemany 参数列表，走 Core UPDATE，
+            # 绕开 ORM 的属性历史/unit-of-work 开销；user_id 留在 WHERE
+            # 里兜底授权
+            reschedule_rows = []
+            priority_rows = []
+            status_rows = []
             for adj in adjustments:
                 task_id = adj.get("task_id")
                 action = adj.get("action")
 
-                if not task_id or not action:
-                    continue
-
-                task = (
-                    db.query(Task)
-                    .filter(Task.id == task_id, Task.user_id == user_id)
-                    .first()
-                )
-
-                if not task:
+                if not task_id or not action or task_id not in valid_ids:
                     continue
 
                 if action == "reschedule":
                     new_date = adj.get("new_due_date")
                     if new_date:
-                        task.due_date = date.fromisoformat(new_date)
+                        reschedule_rows.append(
+                            {"tid": task_id, "d": date.fromisoformat(new_date)}
+                        )
                     applied_count += 1
 
                 elif action == "change_priority":
-                    task.priority = adj.get("new_priority", task.priority)
+                    new_priority = adj.get("new_priority")
+                    if new_priority is not None:
+                        priority_rows.append({"tid": task_id, "p": new_priority})
                     applied_count += 1
 
                 elif action == "mark_completed":
-                    task.status = "completed"
+                    status_rows.append({"tid": task_id, "s": "completed"})
                     applied_count += 1
 
                 elif action == "mark_skipped":
-                    task.status = "skipped"
+                    status_rows.append({"tid": task_id, "s": "skipped"})
                     applied_count += 1
 
-            if goal_id:
-                for task_data in new_tasks:
-                    new_task = Task(
-                        user_id=user_id,
-                        goal_id=goal_id,
-                        title=task_data.get("title", ""),
-                        description=task_data.get("description", ""),
-                        due_date=date.fromisoformat(
+            def _guarded_update(values: dict):
+                return (
+                    update(Task)
+                    .where(Task.id == bindparam("tid"), Task.user_id == user_id)
+                    .values(**values)
+                )
+
+            # 走 Core 连接执行 executemany：ORM 的 Session.execute 不支持
+            # 带额外 WHERE 条件的批量 UPDATE 参数列表
+            if reschedule_rows:
+                db.connection().execute(
+                    _guarded_update({"due_date": bindparam("d")}), reschedule_rows
+                )
+            if priority_rows:
+                db.connection().execute(
+                    _guarded_update({"priority": bindparam("p")}), priority_rows
+                )
+            if status_rows:
+                db.connection().execute(
+                    _guarded_update({"status": bindparam("s")}), status_rows
+                )
+
+            if goal_id and new_tasks:
+                rows = [
+                    {
+                        "user_id": user_id,
+                        "goal_id": goal_id,
+                        "title": task_data.get("title", ""),
+                        "description": task_data.get("description", ""),
+                        "due_date": date.fromisoformat(
                             task_data.get("due_date", date.today().isoformat())
                         ),
-                        status="pending",
-                        priority=task_data.get("priority", 1),
-                    )
-                    db.add(new_task)
-                    created_count += 1
+                        "status": "pending",
+                        "priority": task_data.get("priority", 1),
+                    }
+                    for task_data in new_tasks
+                ]
+                db.bulk_insert_mappings(Task, rows)
+                created_count = len(rows)
 
             db.commit()
 
@@ -262,16 +373,25 @@ Please analyze the data and provide recommendations in the following JSON format
         goal_id: int | None = None,
         auto_apply: bool = True,
     ) -> dict:
-        execution_logs = await self.get_execution_logs_for_reflection(
-            user_id=user_id, days=7, goal_id=goal_id
+        # 三个取数各自开独立会话，互不依赖；同步 SQLAlchemy 不会让出
+        # 事件循环，丢进线程池并行，预处理延迟从 t1+t2+t3 降到 max(t1,t2,t3)
+        execution_logs, tasks, goal_outline = await asyncio.gather(
+            asyncio.to_thread(
+                self.get_execution_logs_for_reflection,
+                user_id=user_id,
+                days=7,
+                goal_id=goal_id,
+            ),
+            asyncio.to_thread(
+                self.get_tasks_for_reflection, user_id=user_id, goal_id=goal_id
+            ),
+            (
+                asyncio.to_thread(self.get_goal_outline, goal_id)
+                if goal_id
+                else asyncio.sleep(0, result=None)
+            ),
         )
 
-        tasks = await self.get_tasks_for_reflection(user_id=user_id, goal_id=goal_id)
-
-        goal_outline = None
-        if goal_id:
-            goal_outline = await self.get_goal_outline(goal_id)
-
         llm_result = await self.call_reflection_llm(
             execution_logs=execution_logs,
             tasks=tasks,
@@ -3,17 +3,103 @@
 
 基于 pgvector 的向量相似度搜索。
 """
+import hashlib
 import logging
+import threading
 from typing import Any
 
+import numpy as np
+from cachetools import TTLCache
 from sqlalchemy import text
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
 
-from app.dependencies import SessionLocal
-from app.models_memory import MemoryEmbedding
+from app.dependencies import SessionLocal, engine
+from app.models_memory import EMBEDDING_DIMENSION, MemoryEmbedding
+
+# usearch 为可选依赖：装了就启用进程内影子索引，否则全部走 pgvector
+try:
+    from usearch.index import Index as _UsearchIndex
+except ImportError:
+    _UsearchIndex = None
 
 logger = logging.getLogger(__name__)
 
+# 只读搜索专用会话：不 flush、commit 后不失效对象，
+# 省掉纯 text() 查询用不到的身份映射簿记
+_ReadSession = sessionmaker(
+    bind=engine, autoflush=False, expire_on_commit=False
+)
+
+
+# 模块级 text() 常量：memory_type 有/无两个分支合并成一条参数化语句
+# ((:memory_type) IS NULL OR ...)，SQLAlchemy 编译缓存与数据库计划缓存
+# 都始终命中同一语句，代码也少一半
+_SQL_SEARCH = text("""
+    SELECT
+        me.id,
+        me.memory_id,
+        me.user_id,
+        me.memory_type,
+        to_char(me.created_at, 'YYYY-MM-DD"T"HH24:MI:SS.US') as created_at_iso,
+        um.content,
+        um.context,
+        -(me.embedding <#> :embedding::halfvec) as similarity
+    FROM memory_embeddings me
+    JOIN user_memories um ON me.memory_id = um.id
+    WHERE me.user_id = :user_id
+        AND ((:memory_type) IS NULL OR me.memory_type = :memory_type)
+        AND (me.embedding <#> :embedding::halfvec) < :threshold
+    ORDER BY me.embedding <#> :embedding::halfvec
+    LIMIT :limit
+""")
+
+_SQL_HYBRID = text("""
+    SELECT
+        me.id,
+        me.memory_id,
+        me.user_id,
+        me.memory_type,
+        to_char(me.created_at, 'YYYY-MM-DD"T"HH24:MI:SS.US') as created_at_iso,
+        um.content,
+        um.context,
+        -(me.embedding <#> :embedding::halfvec) as similarity
+    FROM memory_embeddings me
+    JOIN user_memories um ON me.memory_id = um.id
+    WHERE me.user_id = :user_id
+        AND ((:memory_type) IS NULL OR me.memory_type = :memory_type)
+        AND um.content::text ILIKE :keyword
+    ORDER BY me.embedding <#> :embedding::halfvec
+    LIMIT :limit
+""")
+
+
+_SQL_RELTUPLES = text(
+    "SELECT COALESCE(reltuples, 0) FROM pg_class "
+    "WHERE relname = 'memory_embeddings'"
+)
+
+_SQL_SET_EF_SEARCH = text("SELECT set_config('hnsw.ef_search', :ef, true)")
+
+_SQL_SHADOW_LOAD = text(
+    "SELECT id, embedding::text FROM memory_embeddings "
+    "WHERE user_id = :user_id"
+)
+
+# 影子索引命中后按 ID 取回内容字段，顺序在 Python 侧按相似度重排
+_SQL_BY_IDS = text("""
+    SELECT
+        me.id,
+        me.memory_id,
+        me.user_id,
+        me.memory_type,
+        to_char(me.created_at, 'YYYY-MM-DD"T"HH24:MI:SS.US') as created_at_iso,
+        um.content,
+        um.context
+    FROM memory_embeddings me
+    JOIN user_memories um ON me.memory_id = um.id
+    WHERE me.id = ANY(:ids)
+""")
+
 
 class SemanticSearchService:
     """
@@ -22,9 +108,150 @@ class SemanticSearchService:
     使用 pgvector 进行向量相似度搜索。
     """
     
+    # 结果缓存：容量 1000，TTL 300 秒
+    CACHE_MAXSIZE = 1000
+    CACHE_TTL = 300
+    # 查询文本 -> 向量字面量缓存：重复查询可完全跳过 embedding 调用
+    EMB_CACHE_MAXSIZE = 2048
+    EMB_CACHE_TTL = 3600
+
     def __init__(self):
+        self._params: dict | None = None
+        # 重复查询直接命中进程内缓存，省掉整个 ANN 查询往返；
+        # 写入靠 per-user 版本号失效 (见 invalidate_user)
+        self._result_cache: TTLCache = TTLCache(
+            maxsize=self.CACHE_MAXSIZE, ttl=self.CACHE_TTL
+        )
+        self._emb_cache: TTLCache = TTLCache(
+            maxsize=self.EMB_CACHE_MAXSIZE, ttl=self.EMB_CACHE_TTL
+        )
+        self._cache_lock = threading.Lock()
+        self._user_versions: dict[int, int] = {}
+        # 进程内 USearch 影子索引 (per-user 懒构建，可选依赖)
+        self._shadow: dict[int, Any] = {}
         self._check_pgvector()
-    
+
+    def _cache_key(self, user_id: int, *parts: Any) -> bytes:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(str(self._user_versions.get(user_id, 0)).encode())
+        for part in (user_id, *parts):
+            h.update(b"|")
+            h.update(str(part).encode())
+        return h.digest()
+
+    def invalidate_user(self, user_id: int) -> None:
+        """记忆写入后让该用户的缓存结果失效 (版本号自增，影子索引重建)"""
+        with self._cache_lock:
+            self._user_versions[user_id] = self._user_versions.get(user_id, 0) + 1
+            self._shadow.pop(user_id, None)
+
+    @staticmethod
+    def _literal_to_array(literal: str) -> "np.ndarray":
+        """halfvec 文本字面量 "[x,y,...]" -> float32 数组"""
+        return np.array(literal[1:-1].split(","), dtype=np.float32)
+
+    def _get_shadow_index(self, user_id: int):
+        """懒构建该用户的进程内 HNSW 影子索引 (usearch 未安装时返回 None)"""
+        if _UsearchIndex is None:
+            return None
+        with self._cache_lock:
+            index = self._shadow.get(user_id)
+        if index is not None:
+            return index
+        try:
+            with _ReadSession() as db:
+                rows = db.execute(
+                    _SQL_SHADOW_LOAD, {"user_id": user_id}
+                ).fetchall()
+            index = _UsearchIndex(
+                ndim=EMBEDDING_DIMENSION,
+                metric="cos",
+                dtype="f32",
+                connectivity=16,
+                expansion_add=64,
+                expansion_search=100,
+            )
+            if rows:
+                keys = np.array([row[0] for row in rows], dtype=np.int64)
+                vectors = np.array(
+                    [self._literal_to_array(row[1]) for row in rows],
+                    dtype=np.float32,
+                )
+                index.add(keys, vectors)
+            with self._cache_lock:
+                self._shadow[user_id] = index
+            return index
+        except Exception as e:
+            logger.warning(f"Shadow index build failed for user {user_id}: {e}")
+            return None
+
+    def _search_shadow(
+        self,
+        query_embedding: str,
+        user_id: int,
+        limit: int,
+        similarity_threshold: float,
+    ) -> list[dict] | None:
+        """影子索引优先查询；未命中/无结果时返回 None 回退 pgvector"""
+        index = self._get_shadow_index(user_id)
+        if index is None or len(index) == 0:
+            return None
+        try:
+            matches = index.search(
+                self._literal_to_array(query_embedding), limit
+            )
+            # usearch cos 距离 = 1 - 余弦相似度
+            hits = [
+                (int(m.key), 1.0 - float(m.distance))
+                for m in matches
+            ]
+            hits = [h for h in hits if h[1] >= similarity_threshold]
+            if not hits:
+                return None
+            with _ReadSession() as db:
+                rows = db.execute(
+                    _SQL_BY_IDS, {"ids": [h[0] for h in hits]}
+                ).fetchall()
+            by_id = {row[0]: row for row in rows}
+            results = []
+            for emb_id, similarity in hits:
+                row = by_id.get(emb_id)
+                if row is None:
+                    continue
+                results.append({
+                    "id": row[0],
+                    "memory_id": row[1],
+                    "user_id": row[2],
+                    "memory_type": row[3],
+                    "created_at": row[4],
+                    "content": row[5],
+                    "context": row[6],
+                    "similarity": similarity,
+                })
+            return results or None
+        except Exception as e:
+            logger.warning(f"Shadow index search failed: {e}")
+            return None
+
+    def _auto_params(self, db: Session) -> dict:
+        """按 memory_embeddings 规模分档选 HNSW 参数 (结果缓存在实例上)
+
+        行数取 pg_class.reltuples 估计值，避免为调参做全表 count。
+        """
+        if self._params is not None:
+            return self._params
+
+        row_count = db.execute(_SQL_RELTUPLES).scalar() or 0
+
+        if row_count < 100_000:
+            self._params = {"m": 16, "ef_construction": 64, "ef_search": 40}
+        elif row_count < 1_000_000:
+            self._params = {"m": 24, "ef_construction": 100, "ef_search": 100}
+        else:
+            self._params = {"m": 32, "ef_construction": 128, "ef_search": 200}
+        logger.info(f"HNSW params for ~{int(row_count)} rows: {self._params}")
+        return self._params
+
     def _check_pgvector(self) -> bool:
         """检查 pgvector 扩展是否可用"""
         try:
@@ -38,192 +265,229 @@ class SemanticSearchService:
             return False
     
     def enable_pgvector(self) -> bool:
-        """在数据库中启用 pgvector 扩展"""
+        """在数据库中启用 pgvector 扩展并确保 ANN 索引存在"""
         try:
             with SessionLocal() as db:
                 db.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
                 db.commit()
                 logger.info("pgvector extension enabled")
-                return True
+            return self.ensure_hnsw_index()
         except Exception as e:
             logger.error(f"Failed to enable pgvector: {e}")
             return False
+
+    def ensure_hnsw_index(self) -> bool:
+        """按表规模建 HNSW 索引，把精确全表扫描换成亚线性 ANN 查找
+
+        向量写入时已归一化，查询用 <#> 内积排序，故 opclass 取
+        halfvec_ip_ops。m/ef_construction/ef_search 由 _auto_params
+        按行数分档。
+        """
+        try:
+            with SessionLocal() as db:
+                params = self._auto_params(db)
+                # 建索引是一次性的排序/图构建，放宽工作内存加速 build
+                db.execute(text(
+                    "SELECT set_config('maintenance_work_mem', '2GB', true)"
+                ))
+                db.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_memory_embeddings_embedding_hnsw "
+                    "ON memory_embeddings "
+                    "USING hnsw (embedding halfvec_ip_ops) "
+                    f"WITH (m = {params['m']}, "
+                    f"ef_construction = {params['ef_construction']})"
+                ))
+                db.commit()
+                logger.info(f"HNSW index ensured with params {params}")
+                return True
+        except Exception as e:
+            logger.error(f"Failed to create HNSW index: {e}")
+            return False
+
+    def _set_ef_search(self, db: Session, ef_search: int | None) -> None:
+        """事务内设置 hnsw.ef_search (召回/延迟旋钮，SET LOCAL 语义)
+
+        未显式指定时用 _auto_params 分档的默认值。
+        """
+        if ef_search is None:
+            ef_search = self._auto_params(db)["ef_search"]
+        db.execute(_SQL_SET_EF_SEARCH, {"ef": str(int(ef_search))})
     
+    async def search_by_text(
+        self,
+        query_text: str,
+        user_id: int,
+        memory_type: str | None = None,
+        limit: int = 5,
+        similarity_threshold: float = 0.7,
+        ef_search: int | None = None,
+    ) -> list[dict]:
+        """
+        按查询文本搜索相似记忆
+
+        文本 -> 向量字面量有独立缓存：重复文本直接复用向量，
+        完全不触发 embedding 服务调用。已有向量的调用方仍走
+        search_similar。
+        """
+        # 延迟导入避免与 enhanced_memory_service 形成环
+        from app.services.embedding_service import embedding_service
+
+        emb_key = hashlib.blake2b(
+            query_text.encode(), digest_size=16
+        ).digest()
+        with self._cache_lock:
+            vector_literal = self._emb_cache.get(emb_key)
+        if vector_literal is None:
+            vector = await embedding_service.generate_embedding(query_text)
+            vector_literal = embedding_service.vector_to_halfvec(vector)
+            with self._cache_lock:
+                self._emb_cache[emb_key] = vector_literal
+
+        return self.search_similar(
+            query_embedding=vector_literal,
+            user_id=user_id,
+            memory_type=memory_type,
+            limit=limit,
+            similarity_threshold=similarity_threshold,
+            ef_search=ef_search,
+        )
+
     def search_similar(
         self,
-        query_embedding: bytes,
+        query_embedding: str,
         user_id: int,
         memory_type: str | None = None,
         limit: int = 5,
         similarity_threshold: float = 0.7,
+        ef_search: int | None = None,
     ) -> list[dict]:
         """
         搜索相似记忆
-        
+
         Args:
-            query_embedding: 查询向量 (bytes)
+            query_embedding: 查询向量 (halfvec 文本字面量)
             user_id: 用户 ID
             memory_type: 记忆类型过滤 (可选)
             limit: 返回数量限制
             similarity_threshold: 相似度阈值
-            
+            ef_search: HNSW 候选队列大小，越大召回越高、越慢；
+                None 时按表规模取分档默认值
+
         Returns:
             相似记忆列表
         """
+        key = self._cache_key(
+            user_id, query_embedding, memory_type, limit,
+            similarity_threshold, ef_search,
+        )
+        with self._cache_lock:
+            cached = self._result_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # 无类型过滤时先查进程内影子索引：SIMD 内存内 top-K，
+        # 只有内容回取走一次轻量 IN 查询
+        if memory_type is None:
+            shadow_results = self._search_shadow(
+                query_embedding, user_id, limit, similarity_threshold
+            )
+            if shadow_results is not None:
+                with self._cache_lock:
+                    self._result_cache[key] = shadow_results
+                return shadow_results
+
         try:
-            with SessionLocal() as db:
-                # 构建查询
-                if memory_type:
-                    sql = text("""
-                        SELECT 
-                            me.id,
-                            me.memory_id,
-                            me.user_id,
-                            me.memory_type,
-                            me.created_at,
-                            um.content,
-                            um.context,
-                            1 - (me.embedding <=> :embedding::vector) as similarity
-                        FROM memory_embeddings me
-                        JOIN user_memories um ON me.memory_id = um.id
-                        WHERE me.user_id = :user_id
-                            AND me.memory_type = :memory_type
-                            AND (me.embedding <=> :embedding::vector) < :threshold
-                        ORDER BY me.embedding <=> :embedding::vector
-                        LIMIT :limit
-                    """)
-                    result = db.execute(sql, {
-                        "embedding": query_embedding,
-                        "user_id": user_id,
-                        "memory_type": memory_type,
-                        "threshold": 1 - similarity_threshold,
-                        "limit": limit,
-                    })
-                else:
-                    sql = text("""
-                        SELECT 
-                            me.id,
-                            me.memory_id,
-                            me.user_id,
-                            me.memory_type,
-                            me.created_at,
-                            um.content,
-                            um.context,
-                            1 - (me.embedding <=> :embedding::vector) as similarity
-                        FROM memory_embeddings me
-                        JOIN user_memories um ON me.memory_id = um.id
-                        WHERE me.user_id = :user_id
-                            AND (me.embedding <=> :embedding::vector) < :threshold
-                        ORDER BY me.embedding <=> :embedding::vector
-                        LIMIT :limit
-                    """)
-                    result = db.execute(sql, {
-                        "embedding": query_embedding,
-                        "user_id": user_id,
-                        "threshold": 1 - similarity_threshold,
-                        "limit": limit,
-                    })
-                
+            with _ReadSession() as db:
+                # 声明只读事务，连接池/PgBouncer 可据此路由到副本
+                db.connection(
+                    execution_options={"postgresql_readonly": True}
+                )
+                self._set_ef_search(db, ef_search)
+                # 向量写入时已做 L2 归一化 (见 vector_to_halfvec)，
+                # 单位向量的内积 <#> 即余弦相似度 (pgvector 返回负值)
+                result = db.execute(_SQL_SEARCH, {
+                    "embedding": query_embedding,
+                    "user_id": user_id,
+                    "memory_type": memory_type,
+                    "threshold": -similarity_threshold,
+                    "limit": limit,
+                })
+
                 rows = result.fetchall()
-                return [
+                results = [
                     {
                         "id": row[0],
                         "memory_id": row[1],
                         "user_id": row[2],
                         "memory_type": row[3],
-                        "created_at": row[4].isoformat() if row[4] else None,
+                        "created_at": row[4],
                         "content": row[5],
                         "context": row[6],
                         "similarity": float(row[7]) if row[7] else 0.0,
                     }
                     for row in rows
                 ]
+                with self._cache_lock:
+                    self._result_cache[key] = results
+                return results
         except Exception as e:
             logger.error(f"Semantic search failed: {e}")
             return []
     
     def search_by_keyword_and_similarity(
         self,
-        query_embedding: bytes,
+        query_embedding: str,
         user_id: int,
         keyword: str,
         memory_type: str | None = None,
         limit: int = 5,
+        ef_search: int | None = None,
     ) -> list[dict]:
         """
         结合关键词和语义相似度搜索
-        
+
         先做关键词过滤，再做向量相似度排序。
         """
+        key = self._cache_key(
+            user_id, query_embedding, keyword, memory_type, limit, ef_search
+        )
+        with self._cache_lock:
+            cached = self._result_cache.get(key)
+        if cached is not None:
+            return cached
+
         try:
-            with SessionLocal() as db:
-                import json
-                
-                if memory_type:
-                    sql = text("""
-                        SELECT 
-                            me.id,
-                            me.memory_id,
-                            me.user_id,
-                            me.memory_type,
-                            me.created_at,
-                            um.content,
-                            um.context,
-                            1 - (me.embedding <=> :embedding::vector) as similarity
-                        FROM memory_embeddings me
-                        JOIN user_memories um ON me.memory_id = um.id
-                        WHERE me.user_id = :user_id
-                            AND me.memory_type = :memory_type
-                            AND um.content::text ILIKE :keyword
-                        ORDER BY me.embedding <=> :embedding::vector
-                        LIMIT :limit
-                    """)
-                    result = db.execute(sql, {
-                        "embedding": query_embedding,
-                        "user_id": user_id,
-                        "memory_type": memory_type,
-                        "keyword": f"%{keyword}%",
-                        "limit": limit,
-                    })
-                else:
-                    sql = text("""
-                        SELECT 
-                            me.id,
-                            me.memory_id,
-                            me.user_id,
-                            me.memory_type,
-                            me.created_at,
-                            um.content,
-                            um.context,
-                            1 - (me.embedding <=> :embedding::vector) as similarity
-                        FROM memory_embeddings me
-                        JOIN user_memories um ON me.memory_id = um.id
-                        WHERE me.user_id = :user_id
-                            AND um.content::text ILIKE :keyword
-                        ORDER BY me.embedding <=> :embedding::vector
-                        LIMIT :limit
-                    """)
-                    result = db.execute(sql, {
-                        "embedding": query_embedding,
-                        "user_id": user_id,
-                        "keyword": f"%{keyword}%",
-                        "limit": limit,
-                    })
-                
+            with _ReadSession() as db:
+                db.connection(
+                    execution_options={"postgresql_readonly": True}
+                )
+                self._set_ef_search(db, ef_search)
+
+                result = db.execute(_SQL_HYBRID, {
+                    "embedding": query_embedding,
+                    "user_id": user_id,
+                    "memory_type": memory_type,
+                    "keyword": f"%{keyword}%",
+                    "limit": limit,
+                })
+
                 rows = result.fetchall()
-                return [
+                results = [
                     {
                         "id": row[0],
                         "memory_id": row[1],
                         "user_id": row[2],
                         "memory_type": row[3],
-                        "created_at": row[4].isoformat() if row[4] else None,
+                        "created_at": row[4],
                         "content": row[5],
                         "context": row[6],
                         "similarity": float(row[7]) if row[7] else 0.0,
                     }
                     for row in rows
                 ]
+                with self._cache_lock:
+                    self._result_cache[key] = results
+                return results
         except Exception as e:
             logger.error(f"Hybrid search failed: {e}")
             return []
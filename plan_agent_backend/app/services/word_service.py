@@ -1,13 +1,18 @@
+import csv
+import io
 import logging
 import random
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from typing import Optional
 
-from sqlalchemy import and_
+from sqlalchemy import Integer, and_, cast, func
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Session
 
 from app.dependencies import SessionLocal
 from app.models import UserWordSettings, WordBank, DailyWordTask
+from app.utils.timezone import get_utc_now
 
 logger = logging.getLogger(__name__)
 
@@ -43,58 +48,61 @@ def generate_daily_words(
         5. 创建DailyWordTask记录
         6. 若当天已存在任务，直接返回已存在的任务
     """
-    # 1. 查询用户设置
-    settings = (
-        db.query(UserWordSettings).filter(UserWordSettings.user_id == user_id).first()
-    )
-
-    if settings is None:
-        return None
-
-    # 2. 检查当天是否已存在任务（get_or_create模式）
-    existing_task = (
-        db.query(DailyWordTask)
-        .filter(
+    # 1+2. 设置查询与当天任务检查合并为一次 LEFT JOIN 往返
+    # （get_or_create模式；在 generate_all_daily_tasks 里按用户数放大）
+    row = (
+        db.query(
+            UserWordSettings.daily_count,
+            UserWordSettings.selected_tags,
+            DailyWordTask.id,
+        )
+        .outerjoin(
+            DailyWordTask,
             and_(
-                DailyWordTask.user_id == user_id,
+                DailyWordTask.user_id == UserWordSettings.user_id,
                 DailyWordTask.task_date == target_date,
-            )
+            ),
         )
+        .filter(UserWordSettings.user_id == user_id)
         .first()
     )
 
-    if existing_task:
-        return existing_task
+    if row is None:
+        return None
+
+    daily_count, selected_tags, existing_task_id = row
+
+    if existing_task_id is not None:
+        return (
+            db.query(DailyWordTask)
+            .filter(DailyWordTask.id == existing_task_id)
+            .first()
+        )
 
-    # 获取用户设置
-    daily_count = settings.daily_count or DEFAULT_DAILY_COUNT
-    selected_tags = settings.selected_tags
+    daily_count = daily_count or DEFAULT_DAILY_COUNT
 
-    # 3. 筛选单词
+    # 3. 筛选并抽样单词：随机化和截断都在数据库端完成，
+    # 只有daily_count行过网络，不再把整个词库ID搬进Python打乱
     if selected_tags and len(selected_tags) > 0:
-        # PostgreSQL ARRAY字段：筛选包含任一标签的单词
-        # 使用 any() 方法
-        words_query = db.query(WordBank.id).filter(WordBank.tags.any(selected_tags))
+        # PostgreSQL ARRAY字段：&& 重叠运算符筛选包含任一标签的单词
+        # （可走 word_bank.tags 的 GIN 索引）
+        words_query = db.query(WordBank.id).filter(
+            WordBank.tags.overlap(selected_tags)
+        )
     else:
         # 如果没有选择标签，获取所有单词
         words_query = db.query(WordBank.id)
 
-    # 执行查询获取所有匹配的单词ID
-    all_word_ids = [row[0] for row in words_query.all()]
+    selected_word_ids = [
+        row[0]
+        for row in words_query.order_by(func.random()).limit(daily_count).all()
+    ]
 
-    # 4. 处理单词数量不足的情况
-    if len(all_word_ids) == 0:
-        # 没有匹配的单词，返回None或创建空任务
+    # 4. 处理没有匹配单词的情况
+    if len(selected_word_ids) == 0:
         # 没有匹配的单词，返回None或创建空任务
         return None
 
-    # 如果单词数量不足daily_count，取全部
-    actual_count = min(daily_count, len(all_word_ids))
-
-    # 5. 随机打乱并选取
-    random.shuffle(all_word_ids)
-    selected_word_ids = all_word_ids[:actual_count]
-
     # 6. 创建每日单词任务
     new_task = DailyWordTask(
         user_id=user_id,
@@ -280,16 +288,62 @@ def get_words_by_ids(db: Session, word_ids: list[int]) -> list[WordBank]:
     if not word_ids:
         return []
 
-    # 查询单词并保持ID顺序
-    words = (
+    # 排序下推到数据库：array_position 按传入ID顺序返回行，
+    # 省掉Python侧建dict再重排的两次额外遍历
+    return (
         db.query(WordBank)
         .filter(WordBank.id.in_(word_ids))
+        .order_by(
+            func.array_position(
+                cast(word_ids, ARRAY(Integer)), WordBank.id
+            )
+        )
         .all()
     )
 
-    # 按word_ids顺序排序
-    word_dict = {word.id: word for word in words}
-    return [word_dict[wid] for wid in word_ids if wid in word_dict]
+
+def _copy_insert_daily_tasks(db: Session, rows: list[dict]) -> None:
+    """用 COPY 批量写入每日任务
+
+    所有行先 COPY 进临时表（单条流式命令，无逐行协议往返），
+    再一条 INSERT ... ON CONFLICT DO NOTHING 落正式表，
+    保留与并发单用户创建竞争时的幂等语义。
+    """
+    created_at = get_utc_now()
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow([
+            row["user_id"],
+            row["task_date"].isoformat(),
+            # PostgreSQL 数组字面量
+            "{" + ",".join(map(str, row["word_ids"])) + "}",
+            row["completed_count"],
+            row["status"],
+            created_at.isoformat(sep=" "),
+        ])
+    buf.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(
+            "CREATE TEMP TABLE tmp_daily_word_tasks ("
+            "user_id integer, task_date date, word_ids integer[], "
+            "completed_count integer, status varchar(20), "
+            "created_at timestamp) ON COMMIT DROP"
+        )
+        cursor.copy_expert(
+            "COPY tmp_daily_word_tasks FROM STDIN WITH (FORMAT CSV)", buf
+        )
+        cursor.execute(
+            "INSERT INTO daily_word_tasks "
+            "(user_id, task_date, word_ids, completed_count, status, created_at) "
+            "SELECT user_id, task_date, word_ids, completed_count, status, created_at "
+            "FROM tmp_daily_word_tasks "
+            "ON CONFLICT (user_id, task_date) DO NOTHING"
+        )
+    finally:
+        cursor.close()
 
 
 def generate_all_daily_tasks(target_date: date) -> dict:
@@ -309,30 +363,86 @@ def generate_all_daily_tasks(target_date: date) -> dict:
     logger.info(f"Starting generate_all_daily_tasks for {target_date}")
 
     try:
+        # 单会话批处理：预载设置和已有任务，按标签组合共享候选词查询，
+        # 最后一条多行INSERT落库，把O(N_users)次往返压成常数次
         with SessionLocal() as db:
-            # 查询所有有设置的用户ID
-            users = db.query(UserWordSettings).all()
-            user_ids = [u.user_id for u in users]
-
-        logger.info(f"Found {len(user_ids)} users with word settings")
-
-        # 在with块外部处理每个用户，每个用户使用独立的session
-        for user_id in user_ids:
-            try:
+            settings_rows = db.query(
+                UserWordSettings.user_id,
+                UserWordSettings.daily_count,
+                UserWordSettings.selected_tags,
+            ).all()
+            logger.info(f"Found {len(settings_rows)} users with word settings")
+
+            existing_users = {
+                user_id
+                for (user_id,) in db.query(DailyWordTask.user_id).filter(
+                    DailyWordTask.task_date == target_date
+                )
+            }
+
+            # 先收集待生成用户用到的标签组合，再并行拉取各组合的候选词：
+            # 每个组合一条查询、独立会话，GIL 在 DB I/O 期间释放，
+            # 组合数多时接近线性加速
+            pending_tag_keys: dict[tuple, list[str] | None] = {}
+            for user_id, daily_count, selected_tags in settings_rows:
+                if user_id in existing_users:
+                    continue
+                tags_key = tuple(sorted(selected_tags)) if selected_tags else ()
+                pending_tag_keys.setdefault(tags_key, selected_tags)
+
+            def _fetch_word_ids(selected_tags: list[str] | None) -> list[int]:
                 with SessionLocal() as db_inner:
-                    # 生成每日任务（如果当天不存在）
-                    task = generate_daily_words(db_inner, user_id, target_date)
-                    if task is None:
-                        skipped_count += 1
-                        logger.debug(f"User {user_id}: No settings or no words available")
-                    else:
-                        success_count += 1
-                        logger.debug(f"User {user_id}: Generated task with {len(task.word_ids)} words")
-            except Exception as e:
-                fail_count += 1
-                logger.error(f"Error generating daily words for user {user_id}: {e}")
+                    words_query = db_inner.query(WordBank.id)
+                    if selected_tags:
+                        words_query = words_query.filter(
+                            WordBank.tags.overlap(selected_tags)
+                        )
+                    return [r[0] for r in words_query.all()]
+
+            word_ids_by_tags: dict[tuple, list[int]] = {}
+            if pending_tag_keys:
+                with ThreadPoolExecutor(
+                    max_workers=min(8, len(pending_tag_keys))
+                ) as pool:
+                    word_ids_by_tags = dict(zip(
+                        pending_tag_keys,
+                        pool.map(_fetch_word_ids, pending_tag_keys.values()),
+                    ))
+
+            rows: list[dict] = []
+
+            for user_id, daily_count, selected_tags in settings_rows:
+                # 当天已有任务视为成功（get_or_create语义）
+                if user_id in existing_users:
+                    success_count += 1
+                    continue
+
+                tags_key = tuple(sorted(selected_tags)) if selected_tags else ()
+                all_word_ids = word_ids_by_tags[tags_key]
+                if not all_word_ids:
+                    skipped_count += 1
+                    logger.debug(f"User {user_id}: No words available")
+                    continue
+
+                count = daily_count or DEFAULT_DAILY_COUNT
+                actual_count = min(count, len(all_word_ids))
+                rows.append(
+                    {
+                        "user_id": user_id,
+                        "task_date": target_date,
+                        "word_ids": random.sample(all_word_ids, actual_count),
+                        "completed_count": 0,
+                        "status": "pending",
+                    }
+                )
+
+            if rows:
+                _copy_insert_daily_tasks(db, rows)
+                db.commit()
+            success_count += len(rows)
 
     except Exception as e:
+        fail_count += 1
         logger.error(f"Error in generate_all_daily_tasks: {e}")
 
     result = {
@@ -8,11 +8,11 @@ class TaskStatus(str, Enum):
 
     @classmethod
     def valid_values(cls) -> list[str]:
-        return [e.value for e in cls]
+        return cls._VALUE_LIST
 
     @classmethod
     def is_valid(cls, value: str) -> bool:
-        return value in cls.valid_values()
+        return value in cls._VALUES
 
 
 class GoalStatus(str, Enum):
@@ -22,11 +22,11 @@ class GoalStatus(str, Enum):
 
     @classmethod
     def valid_values(cls) -> list[str]:
-        return [e.value for e in cls]
+        return cls._VALUE_LIST
 
     @classmethod
     def is_valid(cls, value: str) -> bool:
-        return value in cls.valid_values()
+        return value in cls._VALUES
 
 
 class FriendshipStatus(str, Enum):
@@ -35,11 +35,11 @@ class FriendshipStatus(str, Enum):
 
     @classmethod
     def valid_values(cls) -> list[str]:
-        return [e.value for e in cls]
+        return cls._VALUE_LIST
 
     @classmethod
     def is_valid(cls, value: str) -> bool:
-        return value in cls.valid_values()
+        return value in cls._VALUES
 
 
 class CommentType(str, Enum):
@@ -48,11 +48,11 @@ class CommentType(str, Enum):
 
     @classmethod
     def valid_values(cls) -> list[str]:
-        return [e.value for e in cls]
+        return cls._VALUE_LIST
 
     @classmethod
     def is_valid(cls, value: str) -> bool:
-        return value in cls.valid_values()
+        return value in cls._VALUES
 
 
 class MemoryType(str, Enum):
@@ -62,11 +62,11 @@ class MemoryType(str, Enum):
 
     @classmethod
     def valid_values(cls) -> list[str]:
-        return [e.value for e in cls]
+        return cls._VALUE_LIST
 
     @classmethod
     def is_valid(cls, value: str) -> bool:
-        return value in cls.valid_values()
+        return value in cls._VALUES
 
 
 class TaskPriority(int, Enum):
@@ -76,8 +76,23 @@ class TaskPriority(int, Enum):
 
     @classmethod
     def valid_values(cls) -> list[int]:
-        return [e.value for e in cls]
+        return cls._VALUE_LIST
 
     @classmethod
     def is_valid(cls, value: int) -> bool:
-        return value in cls.valid_values()
+        return value in cls._VALUES
+
+
+# 成员值集合在导入时固定：is_valid 走 frozenset O(1) 判断，
+# valid_values 返回缓存的有序列表，不再每次调用重建
+for _enum in (
+    TaskStatus,
+    GoalStatus,
+    FriendshipStatus,
+    CommentType,
+    MemoryType,
+    TaskPriority,
+):
+    _enum._VALUES = frozenset(e.value for e in _enum)
+    _enum._VALUE_LIST = [e.value for e in _enum]
+del _enum
@@ -1,10 +1,12 @@
-from datetime import datetime, date, timezone, timedelta
+import contextvars
+from datetime import datetime, date, time, timezone, timedelta
 from typing import Optional
-import pytz
+from zoneinfo import ZoneInfo
 
 
-LOCAL_TIMEZONE = pytz.timezone("Asia/Shanghai")
-UTC_TIMEZONE = pytz.UTC
+# zoneinfo 的 C 实现可直接挂在 tzinfo 上，无需 pytz 的 localize 两步转换
+LOCAL_TIMEZONE = ZoneInfo("Asia/Shanghai")
+UTC_TIMEZONE = timezone.utc
 
 
 def get_utc_now() -> datetime:
@@ -27,7 +29,7 @@ def local_to_utc(dt: datetime) -> datetime:
     if dt is None:
         return None
     if dt.tzinfo is None:
-        dt = LOCAL_TIMEZONE.localize(dt)
+        dt = dt.replace(tzinfo=LOCAL_TIMEZONE)
     return dt.astimezone(UTC_TIMEZONE)
 
 
@@ -38,6 +40,19 @@ def format_datetime(dt: datetime, format_str: str = "%Y-%m-%d %H:%M:%S") -> str:
     return local_dt.strftime(format_str)
 
 
+def parse_hhmm(value: str | time | None) -> time | None:
+    # 数据库中 due_time 是原生 TIME 列；API/LLM 侧仍用 "HH:MM" 字符串
+    if value is None or isinstance(value, time):
+        return value
+    return datetime.strptime(value, "%H:%M").time()
+
+
+def format_hhmm(value: time | str | None) -> str | None:
+    if value is None or isinstance(value, str):
+        return value
+    return value.strftime("%H:%M")
+
+
 def format_date(d: date, format_str: str = "%Y-%m-%d") -> str:
     if d is None:
         return None
@@ -58,13 +73,28 @@ def parse_datetime(datetime_str: str, format_str: str = "%Y-%m-%d %H:%M:%S") ->
         return None
     try:
         dt = datetime.strptime(datetime_str, format_str)
-        return LOCAL_TIMEZONE.localize(dt)
+        return dt.replace(tzinfo=LOCAL_TIMEZONE)
     except ValueError:
         return None
 
 
+# 请求级"今天"备忘：中间件在请求入口固定一次本地日期，
+# 请求内的重复 get_today_local 调用不再各自做时区换算
+_TODAY: contextvars.ContextVar[Optional[date]] = contextvars.ContextVar(
+    "_today", default=None
+)
+
+
+def set_today_memo() -> contextvars.Token:
+    return _TODAY.set(get_local_now().date())
+
+
+def reset_today_memo(token: contextvars.Token) -> None:
+    _TODAY.reset(token)
+
+
 def get_today_local() -> date:
-    return get_local_now().date()
+    return _TODAY.get() or get_local_now().date()
 
 
 def get_date_range(days: int = 7) -> tuple[date, date]:
@@ -88,6 +118,14 @@ def get_day_of_week(d: date) -> int:
 def time_to_minutes(time_str: str) -> int:
     if not time_str:
         return 0
+    # 固定宽度 "HH:MM" 快路径：直接按字符码算术，不做 split/int 分配
+    if len(time_str) == 5 and time_str[2] == ":":
+        h1 = ord(time_str[0]) - 48
+        h2 = ord(time_str[1]) - 48
+        m1 = ord(time_str[3]) - 48
+        m2 = ord(time_str[4]) - 48
+        if 0 <= h1 <= 9 and 0 <= h2 <= 9 and 0 <= m1 <= 9 and 0 <= m2 <= 9:
+            return (h1 * 10 + h2) * 60 + m1 * 10 + m2
     try:
         hours, minutes = map(int, time_str.split(":"))
         return hours * 60 + minutes
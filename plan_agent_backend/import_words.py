@@ -20,49 +20,57 @@ import argparse
 import json
 import os
 import sys
+from itertools import chain, islice
 from pathlib import Path
-
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-
-# 加载环境变量
-load_dotenv()
+from typing import Iterable
 
 # 添加项目路径
 sys.path.insert(0, str(Path(__file__).parent))
 
-from app.models import WordBank
+# SQLAlchemy / app.models / dotenv 等重依赖延迟到 import_words()/main()
+# 内部导入：以库形式 `import import_words` 复用解析/转换辅助函数时
+# 不触发数据库栈的加载
 
 
-# 添加项目路径
-sys.path.insert(0, str(Path(__file__).parent))
-
-from app.models import WordBank
+# 批量插入/存在性查询的分块大小
+BATCH_SIZE = 1000
 
+# 冲突处理语句按方言构建一次后缓存，逐批只绑定 .values(chunk)；
+# 等大小批次命中 SQLAlchemy 编译缓存里的同一编译结果
+_INSERT_STMTS: dict = {}
 
+# tag -> 共享 tags 列表 (见 transform_word_data)
+_TAGS_CACHE: dict[str | None, list[str] | None] = {}
 
 def parse_json_file(file_path: str) -> list[dict]:
-    """解析JSON文件并返回单词列表"""
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return data
+    """解析JSON文件并返回单词列表
 
+    优先用 orjson（SIMD 加速的 C 解析器，字符串密集的词表
+    解析快数倍）；未安装时回退标准库 json。
+    """
+    try:
+        import orjson
+    except ImportError:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return json.load(f)
 
-def normalize_part_of_speech(pos: str) -> str | None:
-    """标准化词性格式"""
-    if not pos:
-        return None
-    # 移除末尾的点号，如 "n." -> "n", "v." -> "v"
-    return pos.rstrip(".")
+    return orjson.loads(Path(file_path).read_bytes())
 
 
-def generate_audio_urls(word: str) -> tuple[str, str]:
-    """生成占位音频URL"""
-    # 格式: /audio/word_en.mp3, /audio/word_zh.mp3
-    audio_en = f"/audio/{word.lower()}_en.mp3"
-    audio_zh = f"/audio/{word.lower()}_zh.mp3"
-    return audio_en, audio_zh
+def iter_words(file_path: str):
+    """流式迭代JSON顶层数组的单词条目
+
+    用 ijson 逐条产出，内存占用 O(1条) 而非整个文件；
+    未安装 ijson 时回退到一次性解析。
+    """
+    try:
+        import ijson
+    except ImportError:
+        yield from parse_json_file(file_path)
+        return
+
+    with open(file_path, "rb") as f:
+        yield from ijson.items(f, "item")
 
 
 def transform_word_data(
@@ -76,32 +84,46 @@ def transform_word_data(
     处理IELTS和其他格式的差异:
     - IELTS有pronunciation字段，其他没有
     - translations数组需要合并为单一translation + part_of_speech
+
+    全函数不抛异常：畸形条目一律返回None，由调用方计数。
     """
-    word = word_item.get("word", "").strip()
+    if not isinstance(word_item, dict):
+        return None
+
+    # 绑定局部名，省掉热循环里每次取值的方法查找
+    get = word_item.get
+
+    word = get("word")
+    word = word.strip() if isinstance(word, str) else ""
     if not word:
         return None
 
     # 获取翻译和词性
-    translations = word_item.get("translations", [])
-    if translations and len(translations) > 0:
-        # 取第一个翻译作为主翻译
-        first_trans = translations[0]
+    translations = get("translations")
+    if not isinstance(translations, list):
+        translations = []
+    first_trans = translations[0] if translations else None
+    if isinstance(first_trans, dict):
         translation = first_trans.get("translation", "")
-        part_of_speech = normalize_part_of_speech(first_trans.get("type"))
+        # 标准化词性：移除末尾点号，如 "n." -> "n"
+        pos = first_trans.get("type")
+        part_of_speech = pos.rstrip(".") if isinstance(pos, str) and pos else None
     else:
         translation = ""
         part_of_speech = None
 
     # IELTS格式有pronunciation字段，其他格式没有
-    pronunciation = word_item.get("pronunciation")
+    pronunciation = get("pronunciation")
 
-    # 生成音频URL
-    audio_en, audio_zh = generate_audio_urls(word)
+    # 生成占位音频URL: /audio/word_en.mp3, /audio/word_zh.mp3
+    # (lower() 只算一次，热循环里少一半字符串分配)
+    word_lower = word.lower()
+    audio_en = f"/audio/{word_lower}_en.mp3"
+    audio_zh = f"/audio/{word_lower}_zh.mp3"
 
-    # 构建tags
-    tags = []
-    if tag:
-        tags.append(tag)
+    # 构建tags：同一tag的N行共享同一个列表对象，省掉N次小列表分配
+    # (只读不修改；psycopg2 把元组适配成record而非数组，故缓存列表)
+    tags = _TAGS_CACHE.setdefault(tag, [tag] if tag else None)
 
     # 例句可以从translations中提取（如果有多个翻译，可以把其他翻译作为例句）
     examples = None
@@ -109,6 +131,7 @@ def transform_word_data(
         examples = [
             {"translation": t.get("translation", ""), "type": t.get("type", "")}
             for t in translations[1:]
+            if isinstance(t, dict)
         ]
 
     return {
@@ -120,55 +143,88 @@ def transform_word_data(
         "audio_url_en": audio_en,
         "audio_url_zh": audio_zh,
         "difficulty": difficulty,
-        "tags": tags if tags else None,
+        "tags": tags,
     }
 
 
 def import_words(
     session,
-    words_data: list[dict],
+    words_data: "Iterable[dict]",
     tag: str | None = None,
     difficulty: int = 1,
 ) -> tuple[int, int]:
     """
-    导入单词数据
+    导入单词数据 (接受任意可迭代对象，支持流式输入)
 
     返回: (成功数量, 跳过数量)
     """
+    from sqlalchemy import select
+
+    from app.models import WordBank
+
+    if not _INSERT_STMTS:
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+        _INSERT_STMTS["postgresql"] = pg_insert(WordBank).on_conflict_do_nothing(
+            index_elements=["word"]
+        )
+        _INSERT_STMTS["sqlite"] = sqlite_insert(WordBank).on_conflict_do_nothing()
+
     success_count = 0
     skip_count = 0
+    malformed_count = 0
+    seen: set[str] = set()  # 库内已有 + 文件内已见的单词
+
+    # 逐批消费迭代器：解析、存在性查询、批量插入流水线推进，
+    # 内存占用 O(BATCH_SIZE) 而非整个文件
+    dialect = session.get_bind().dialect.name
+    transform = transform_word_data  # 局部绑定，循环内免去全局名查找
+
+    # 预取库内已有单词：重复导入（补充词表的常见场景）下，
+    # 重复词在 transform 之前就被过滤，不做任何转换工作；
+    # ON CONFLICT 仍兜底并发写入的竞争
+    seen.update(
+        word for (word,) in session.execute(select(WordBank.word))
+    )
 
-    for word_item in words_data:
-        try:
-            word_data = transform_word_data(word_item, tag, difficulty)
-            if not word_data:
+    words_iter = iter(words_data)
+    while batch := list(islice(words_iter, BATCH_SIZE)):
+        candidates = []
+        for word_item in batch:
+            # transform 保证不抛异常 (畸形条目返回None)，热循环里
+            # 不再需要逐词 try/except 的异常处理开销
+            raw_word = word_item.get("word") if isinstance(word_item, dict) else None
+            raw_word = raw_word.strip() if isinstance(raw_word, str) else ""
+            if not raw_word or raw_word in seen:
                 skip_count += 1
                 continue
-
-            # 检查单词是否已存在
-            existing = (
-                session.query(WordBank)
-                .filter(WordBank.word == word_data["word"])
-                .first()
-            )
-
-            if existing:
-                # 可选：更新已存在的单词
-                # for key, value in word_data.items():
-                #     setattr(existing, key, value)
+            word_data = transform(word_item, tag, difficulty)
+            if not word_data:
+                malformed_count += 1
                 skip_count += 1
                 continue
+            seen.add(word_data["word"])
+            candidates.append(word_data)
 
-            # 创建新单词记录
-            word = WordBank(**word_data)
-            session.add(word)
-            success_count += 1
-
-        except Exception as e:
-            print(f"Error processing word: {e}", file=sys.stderr)
-            skip_count += 1
+        if not candidates:
             continue
 
+        # 去重下推到数据库：唯一索引 + ON CONFLICT DO NOTHING，
+        # 省掉预查存在性的一次往返；rowcount 即实际插入行数
+        base_stmt = _INSERT_STMTS.get(dialect, _INSERT_STMTS["postgresql"])
+        result = session.execute(base_stmt.values(candidates))
+        inserted = result.rowcount if result.rowcount >= 0 else len(candidates)
+        success_count += inserted
+        skip_count += len(candidates) - inserted
+
+    # 畸形条目汇总成一条告警，避免逐条 stderr 输出拖慢导入
+    if malformed_count:
+        print(
+            f"Warning: skipped {malformed_count} malformed entries",
+            file=sys.stderr,
+        )
+
     session.commit()
     return success_count, skip_count
 
@@ -202,6 +258,11 @@ def main():
 
     args = parser.parse_args()
 
+    # 加载环境变量 (仅命令行入口需要；见模块顶部的延迟导入说明)
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
     # 验证JSON文件存在
     json_path = Path(args.json_file)
     if not json_path.exists():
@@ -215,17 +276,18 @@ def main():
         sys.exit(1)
 
     print(f"Reading JSON file: {args.json_file}")
-    words_data = parse_json_file(args.json_file)
-    print(f"Found {len(words_data)} words in file")
 
     # 显示标签信息
     if args.tag:
         print(f"Tag filter: {args.tag}")
     print(f"Difficulty: {args.difficulty}")
 
-    # 转换数据（预览）
+    # 转换数据（预览）：流式读前3条，随后 chain 回导入迭代器，
+    # 整个文件只扫一遍
+    words_iter = iter_words(args.json_file)
+    preview = list(islice(words_iter, 3))
     print("\nPreview first 3 words:")
-    for i, word_item in enumerate(words_data[:3]):
+    for i, word_item in enumerate(preview):
         word_data = transform_word_data(word_item, args.tag, args.difficulty)
         if word_data:
             print(f"  {i + 1}. {word_data['word']} - {word_data['translation']}")
@@ -235,20 +297,32 @@ def main():
         sys.exit(0)
 
     # 连接数据库
-    engine = create_engine(database_url)
-    SessionLocal = sessionmaker(bind=engine)
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    # psycopg2 的快速 executemany 形式 (多行 VALUES)；该参数为 PG 方言专有
+    engine_kwargs = {}
+    if database_url.startswith("postgresql"):
+        engine_kwargs["executemany_mode"] = "values_plus_batch"
+    engine = create_engine(database_url, **engine_kwargs)
+    # 批量导入会话：不 autoflush、commit 后不失效属性——
+    # 纯 Core 读写用不到工作单元簿记
+    SessionLocal = sessionmaker(
+        bind=engine, autoflush=False, expire_on_commit=False
+    )
     session = SessionLocal()
 
     try:
         print("\nImporting words...")
         success_count, skip_count = import_words(
             session,
-            words_data,
+            chain(preview, words_iter),
             args.tag,
             args.difficulty,
         )
 
         print(f"\nImport complete!")
+        print(f"  Total processed: {success_count + skip_count}")
         print(f"  Success: {success_count}")
         print(f"  Skipped: {skip_count}")
 
@@ -10,27 +10,31 @@ from typing import Generator
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
 
 # 添加项目根目录到 Python 路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.main import app
-from app.dependencies import get_db
-from app.models import Base
-
-
 # ============================================================
 # 测试配置
 # ============================================================
 
-# 测试数据库 URL（使用 SQLite 内存数据库进行快速测试）
-TEST_DATABASE_URL = "sqlite:///./test.db"
+# 测试数据库 URL（纯内存 SQLite：没有磁盘 I/O，每次 commit 不再 fsync）
+TEST_DATABASE_URL = "sqlite://"
 
-# 测试配置环境变量
-os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+# 测试配置环境变量（在导入 app 之前设置，settings 在导入时读取）
 os.environ["DEBUG"] = "true"
 os.environ["JWT_SECRET_KEY"] = "test-secret-key-for-testing-only"
+# bcrypt 代价 12 -> 4：测试里每次哈希/校验快约两个数量级
+os.environ["BCRYPT_ROUNDS"] = "4"
+# 应用引擎也绑定测试库：直接用 SessionLocal 的代码路径不会碰真实数据库
+# (dependencies.py 会按方言跳过 SQLite 不支持的连接池参数)
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+from app.main import app
+from app.dependencies import get_db
+from app.models import Base
 
 
 # ============================================================
@@ -40,59 +44,86 @@ os.environ["JWT_SECRET_KEY"] = "test-secret-key-for-testing-only"
 
 @pytest.fixture(scope="session")
 def engine():
-    """创建测试数据库引擎"""
+    """创建测试数据库引擎
+
+    pytest-xdist 并行时每个 worker 用独立的共享缓存内存库
+    (按 PYTEST_XDIST_WORKER 取名)，worker 间数据天然隔离；
+    单进程运行仍是普通的 sqlite://。
+    """
+    worker = os.environ.get("PYTEST_XDIST_WORKER")
+    if worker:
+        url = f"sqlite:///file:memdb_{worker}?mode=memory&cache=shared&uri=true"
+    else:
+        url = TEST_DATABASE_URL
+
+    # StaticPool 让所有会话共享同一个内存库连接
     engine = create_engine(
-        TEST_DATABASE_URL,
-        connect_args={"check_same_thread": False}
-        if "sqlite" in TEST_DATABASE_URL
-        else {},
+        url,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
     )
 
     # 创建所有表
     Base.metadata.create_all(bind=engine)
 
+    # 直接使用 SessionLocal 的路由 (如 tasks、friends) 绕过 get_db
+    # 覆盖，把应用的会话工厂也重绑到测试引擎，全部落同一个内存库
+    from app.dependencies import SessionLocal as app_session_factory
+
+    app_session_factory.configure(bind=engine)
+
     yield engine
 
-    # 清理
-    Base.metadata.drop_all(bind=engine)
+    # 内存库随连接销毁，无需 drop_all
     engine.dispose()
 
 
 @pytest.fixture(scope="function")
 def db_session(engine) -> Generator[Session, None, None]:
-    """为每个测试创建新的数据库会话"""
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    session = TestingSessionLocal()
+    """为每个测试创建新的数据库会话
+
+    路由里既有 get_db 会话也有独立的 SessionLocal 会话，无法用
+    单连接外层事务回滚隔离；改为 teardown 清空全部表，内存库里
+    逐表 DELETE 的开销可忽略，也无需每个测试重建 schema。
+    """
+    session = Session(bind=engine, autoflush=False)
 
     try:
         yield session
     finally:
+        session.rollback()
         session.close()
+        # 反向按依赖顺序清表，测试间数据互不泄漏
+        with engine.begin() as conn:
+            for table in reversed(Base.metadata.sorted_tables):
+                conn.execute(table.delete())
 
 
 @pytest.fixture(scope="function")
 def db_session_with_data(db_session: Session):
     """创建带有测试数据的数据库会话"""
+    from datetime import date
+
     from app.models import User, Task, Goal
 
-    # 创建测试用户
+    # flush 代替逐对象 commit+refresh：主键在 flush 后即可用，
+    # 数据由 teardown 统一清表（见 db_session）
     user = User(username="testuser", password_hash="hashed_password")
     db_session.add(user)
-    db_session.commit()
-    db_session.refresh(user)
+    db_session.flush()
 
     # 创建测试目标
     goal = Goal(
         user_id=user.id,
         title="测试目标",
         description="这是一个测试目标",
-        start_date="2026-02-01",
-        end_date="2026-02-28",
+        # SQLite 方言要求 Date 列绑定 date 对象而非字符串
+        start_date=date(2026, 2, 1),
+        end_date=date(2026, 2, 28),
         status="active",
     )
     db_session.add(goal)
-    db_session.commit()
-    db_session.refresh(goal)
+    db_session.flush()
 
     # 创建测试任务
     task = Task(
@@ -100,13 +131,12 @@ def db_session_with_data(db_session: Session):
         goal_id=goal.id,
         title="测试任务",
         description="这是一个测试任务",
-        due_date="2026-02-25",
+        due_date=date(2026, 2, 25),
         priority=1,
         status="pending",
     )
     db_session.add(task)
-    db_session.commit()
-    db_session.refresh(task)
+    db_session.flush()
 
     yield db_session
 
@@ -116,9 +146,18 @@ def db_session_with_data(db_session: Session):
 # ============================================================
 
 
+@pytest.fixture(scope="session")
+def _test_client() -> Generator[TestClient, None, None]:
+    """会话级 TestClient：应用 lifespan 启停整个套件只跑一次"""
+    with TestClient(app) as test_client:
+        yield test_client
+
+
 @pytest.fixture(scope="function")
-def client(db_session: Session) -> Generator[TestClient, None, None]:
-    """创建测试客户端"""
+def client(
+    _test_client: TestClient, db_session: Session
+) -> Generator[TestClient, None, None]:
+    """创建测试客户端 (仅逐测试切换 get_db 覆盖)"""
 
     def override_get_db():
         try:
@@ -127,32 +166,44 @@ def client(db_session: Session) -> Generator[TestClient, None, None]:
             pass
 
     app.dependency_overrides[get_db] = override_get_db
+    # 清掉上个测试可能残留的授权头
+    _test_client.headers = {}
 
-    with TestClient(app) as test_client:
-        yield test_client
+    try:
+        yield _test_client
+    finally:
+        app.dependency_overrides.clear()
 
-    app.dependency_overrides.clear()
+
+@pytest.fixture(scope="session")
+def _authtest_password_hash() -> str:
+    """固定明文的 bcrypt 哈希，整个测试会话只算一次
+
+    bcrypt 故意慢 (~100ms/次)，逐测试重算会主导套件耗时。
+    """
+    from app.dependencies import get_password_hash
+
+    return get_password_hash("testpass123")
 
 
 @pytest.fixture(scope="function")
 def authenticated_client(
-    client: TestClient, db_session: Session
+    client: TestClient, db_session: Session, _authtest_password_hash: str
 ) -> tuple[TestClient, str, int]:
     """创建已认证的测试客户端，返回 (client, token, user_id)"""
-    from app.dependencies import get_password_hash
+    from app.dependencies import create_access_token
     from app.models import User
 
     # 创建测试用户
-    user = User(username="authtest", password_hash=get_password_hash("testpass123"))
+    user = User(username="authtest", password_hash=_authtest_password_hash)
     db_session.add(user)
     db_session.commit()
     db_session.refresh(user)
 
-    # 登录获取 token
-    response = client.post(
-        "/api/v1/auth/login", json={"username": "authtest", "password": "testpass123"}
-    )
-    token = response.json()["access_token"]
+    # 直接签发 token，跳过登录请求的 bcrypt 校验和整条 ASGI 链路；
+    # 真实登录流程由 test_login_* 用例覆盖
+    # sub 必须是字符串 (与登录路由一致)；jose 解码时拒绝非字符串 sub
+    token = create_access_token(data={"sub": str(user.id)})
 
     # 设置授权头
     client.headers = {"Authorization": f"Bearer {token}"}
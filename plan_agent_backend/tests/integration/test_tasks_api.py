@@ -3,6 +3,8 @@
 """
 
 import pytest
+from datetime import date
+
 from app.models import Task
 
 
@@ -63,7 +65,7 @@ class TestTaskAPI:
             user_id=user_id,
             title="测试任务",
             description="描述",
-            due_date="2026-02-25",
+            due_date=date(2026, 2, 25),
             priority=1,
             status="pending",
         )
@@ -87,7 +89,7 @@ class TestTaskAPI:
         task = Task(
             user_id=user_id,
             title="原标题",
-            due_date="2026-02-25",
+            due_date=date(2026, 2, 25),
             priority=1,
             status="pending",
         )
@@ -113,7 +115,7 @@ class TestTaskAPI:
         task = Task(
             user_id=user_id,
             title="待完成任务",
-            due_date="2026-02-25",
+            due_date=date(2026, 2, 25),
             priority=1,
             status="pending",
         )
@@ -137,7 +139,7 @@ class TestTaskAPI:
         task = Task(
             user_id=user_id,
             title="待跳过任务",
-            due_date="2026-02-25",
+            due_date=date(2026, 2, 25),
             priority=1,
             status="pending",
         )
@@ -161,7 +163,7 @@ class TestTaskAPI:
         task = Task(
             user_id=user_id,
             title="待删除任务",
-            due_date="2026-02-25",
+            due_date=date(2026, 2, 25),
             priority=1,
             status="pending",
         )
@@ -0,0 +1,53 @@
+"""
+推送服务单元测试
+"""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services.push_service import push_service
+
+
+def _summary(completed: int = 2) -> dict:
+    return {
+        "total_tasks": 3,
+        "completed_count": completed,
+        "pending_count": 3 - completed,
+        "skipped_count": 0,
+        "completion_rate": completed / 3 * 100,
+        "completed_titles": ["背单词", "跑步"][:completed],
+        "pending_titles": ["写周报"],
+        "difficulties": None,
+        "feedback": None,
+    }
+
+
+class TestGenerateReviewMessage:
+    """晚间复盘消息生成测试"""
+
+    @pytest.mark.asyncio
+    async def test_uses_llm_service_singleton(self, monkeypatch):
+        """走 llm_service.chat_raw 并返回模型输出"""
+        response = MagicMock()
+        response.choices[0].message.content = "  今天完成得不错！  "
+        chat_raw = AsyncMock(return_value=response)
+        monkeypatch.setattr(push_service.llm_service, "chat_raw", chat_raw)
+
+        message = await push_service.generate_review_message(1, _summary())
+
+        assert message == "今天完成得不错！"
+        chat_raw.assert_awaited_once()
+        assert chat_raw.await_args.kwargs["max_tokens"] == 200
+
+    @pytest.mark.asyncio
+    async def test_fallback_on_llm_error(self, monkeypatch):
+        """LLM 失败时退回内置鼓励文案"""
+        chat_raw = AsyncMock(side_effect=RuntimeError("boom"))
+        monkeypatch.setattr(push_service.llm_service, "chat_raw", chat_raw)
+
+        message = await push_service.generate_review_message(1, _summary(completed=2))
+        assert "2" in message
+
+        message = await push_service.generate_review_message(1, _summary(completed=0))
+        assert "辛苦" in message